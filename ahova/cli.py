@@ -0,0 +1,136 @@
+"""The `ahova` command: run a script file or stdin, or start the REPL.
+
+Startup is most of the wall time for short scripts, so this module only
+imports what a plain run needs. Diagnostics (token dumps, disassembly,
+profiling, memory reports, timings), snapshots and colored error output
+load their modules when they are asked for.
+"""
+import sys
+
+from lexer.lexer import Lexer, ScriptError
+from interpreter.interpreter import ENGINES, Interpreter
+
+
+def build_parser():
+    import argparse
+    parser = argparse.ArgumentParser(prog="ahova", description="Run an AhovaTheory script.")
+    parser.add_argument("file", nargs="?", help="script to run, - for stdin (default: a REPL on a terminal, else stdin)")
+    parser.add_argument("-i", "--interactive", action="store_true", help="start the REPL")
+    parser.add_argument("--engine", choices=ENGINES, default="ast")
+    parser.add_argument("-O", type=int, choices=(0, 1, 2), default=0, dest="optimize", help="optimization level")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the compiled-script cache")
+    parser.add_argument("--tokens", action="store_true", help="print the token list instead of running")
+    parser.add_argument("--dis", action="store_true", help="print the vm bytecode instead of running")
+    parser.add_argument("--profile", nargs="?", const=True, metavar="PATH",
+                        help="profile statements (ast engine); optionally write collapsed stacks to PATH")
+    parser.add_argument("--time", action="store_true", help="report front end and run times on stderr")
+    parser.add_argument("--memory", action="store_true", help="report memory held by variables (ast engine)")
+    parser.add_argument("--memory-limit", type=parse_size, metavar="SIZE",
+                        help="fail once variables hold more than SIZE bytes, e.g. 512K or 64M (ast engine)")
+    parser.add_argument("--snapshot", metavar="PATH", help="start from the variables saved in a snapshot file")
+    parser.add_argument("--save-snapshot", metavar="PATH", help="save the variables to a snapshot file after the run")
+    return parser
+
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+def parse_size(text):
+    """Bytes for a size like 4096, 512K or 64M."""
+    import argparse
+    number, unit = text.rstrip('KMGkmg'), text[len(text.rstrip('KMGkmg')):].upper()
+    try:
+        size = int(float(number) * SIZE_UNITS[unit])
+    except (KeyError, ValueError):
+        raise argparse.ArgumentTypeError(f"invalid size {text!r}")
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive, got {text!r}")
+    return size
+
+
+def read_source(path):
+    if path is None or path == "-":
+        return sys.stdin.read()
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def report_error(message):
+    """Print an error to stderr, in red when stderr is a terminal."""
+    if sys.stderr.isatty():
+        try:
+            from colorama import Fore, Style
+        except ImportError:
+            pass
+        else:
+            message = f"{Fore.RED}{message}{Style.RESET_ALL}"
+    print(message, file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.interactive or (args.file is None and sys.stdin.isatty()):
+        from .repl import Repl
+        return Repl(engine=args.engine, optimize=args.optimize).loop()
+
+    try:
+        code = read_source(args.file)
+    except (OSError, UnicodeDecodeError) as e:
+        report_error(f"ahova: cannot read {args.file}: {e}")
+        return 2
+
+    profile = args.profile is not None
+    try:
+        if args.tokens:
+            for token in Lexer(code).tokenize():
+                print(token)
+            return 0
+        if args.dis:
+            interpreter = Interpreter(engine="vm", optimize=args.optimize, cache=False)
+            print(interpreter.compile(Lexer(code).tokenize()).disassemble())
+            return 0
+
+        interpreter = Interpreter(engine=args.engine, optimize=args.optimize, cache=not args.no_cache and not profile,
+                                  profile=profile, profile_output=args.profile if isinstance(args.profile, str) else None,
+                                  memory_limit=args.memory_limit, memory_report=args.memory)
+        if args.snapshot:
+            from snapshot.snapshot import Snapshot
+            interpreter.variables.update(Snapshot.load(args.snapshot).variables)
+        if args.time:
+            run_timed(interpreter, code)
+        else:
+            interpreter.interpret_source(code)
+        if args.save_snapshot:
+            from snapshot.snapshot import save_snapshot
+            save_snapshot(interpreter, args.save_snapshot)
+    except OSError as e:
+        report_error(f"ahova: {e}")
+        return 2
+    except ScriptError as e:
+        report_error(str(e))
+        return 1
+    except ValueError as e:
+        report_error(f"ahova: {e}")
+        return 2
+    except Exception as e:
+        # a bug in an engine, or a script nested too deeply to parse
+        report_error(f"Internal error: {type(e).__name__}: {e}")
+        return 1
+    return 0
+
+
+def run_timed(interpreter, code):
+    from time import perf_counter
+    start = perf_counter()
+    if interpreter.engine == "tokens":
+        tokens = Lexer(code).tokenize()
+        compiled_at = perf_counter()
+        interpreter.interpret(tokens)
+    else:
+        compiled = interpreter.compile_source(code)
+        compiled_at = perf_counter()
+        interpreter.execute(compiled)
+    end = perf_counter()
+    print(f"front end {(compiled_at - start) * 1000:.3f}ms, run {(end - compiled_at) * 1000:.3f}ms", file=sys.stderr)
+    if interpreter.engine == "ast":
+        stats = interpreter.specialization
+        print(f"inline caches: {stats.hits} hits, {stats.misses} misses, {stats.respecializations} respecializations", file=sys.stderr)
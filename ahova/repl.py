@@ -0,0 +1,147 @@
+"""Interactive read-eval-print loop for the `ahova` command.
+
+One `Interpreter` lives for the whole session, so variables persist from
+one input to the next. Each input is lexed and parsed on its own; earlier
+inputs are never tokenized again. An input that leaves a `{` block, a
+string or a comment open, or does not end in `;` or `}`, continues on
+the next line; a blank line runs one that is only missing its final `;`,
+so the parser reports it. Ctrl-C stops a running input and keeps the
+variables.
+"""
+import sys
+from time import perf_counter
+
+from lexer.lexer import Lexer, ScriptError
+from interpreter.interpreter import Interpreter
+
+PROMPT = ">>> "
+CONTINUATION = "... "
+
+HELP = """\
+Enter statements to run them; variables persist between inputs.
+Meta-commands:
+  :time     toggle per-input timings (lex, compile, run)
+  :tokens   toggle printing the tokens of each input
+  :vars     show all variables
+  :reset    forget all variables
+  :help     show this help
+  :quit     leave the REPL (as does end of input)"""
+
+# lexer errors that mean the input is not finished yet
+INCOMPLETE_ERRORS = ("Unmatched '{'", "unclosed SKIP", "Unterminated")
+
+
+def is_complete(tokens):
+    significant = [token for token in tokens if token.type not in ('SKIP', 'EOF')]
+    return not significant or significant[-1].type in ('SEMICOLON', 'RGROUP')
+
+
+class Repl:
+    def __init__(self, engine="ast", optimize=0, stdout=None):
+        self.stdout = stdout or sys.stdout
+        self.interpreter = Interpreter(engine=engine, optimize=optimize, cache=False)
+        self.show_time = False
+        self.show_tokens = False
+        self.lines = []
+
+    @property
+    def prompt(self):
+        return CONTINUATION if self.lines else PROMPT
+
+    def print(self, *args):
+        print(*args, file=self.stdout)
+
+    def feed(self, line):
+        """Add one line of input, running it once it forms complete
+        statements. Returns False when the session should end."""
+        if not self.lines and line.strip().startswith(":"):
+            return self.command(line.strip())
+
+        self.lines.append(line)
+        source = "\n".join(self.lines)
+        start = perf_counter()
+        try:
+            tokens = Lexer(source).tokenize()
+        except ScriptError as e:
+            if str(e).startswith(INCOMPLETE_ERRORS):
+                return True
+            self.lines = []
+            self.print(e)
+            return True
+        if not is_complete(tokens) and line.strip():
+            return True
+        self.lines = []
+        self.run(tokens, perf_counter() - start)
+        return True
+
+    def run(self, tokens, lex_time):
+        if self.show_tokens:
+            for token in tokens:
+                self.print(token)
+        interpreter = self.interpreter
+        times = {'compile': 0.0, 'run': 0.0}
+        phase = 'run' if interpreter.engine == 'tokens' else 'compile'
+        start = perf_counter()
+        try:
+            if phase == 'compile':
+                compiled = interpreter.compile(tokens)
+                times['compile'] = perf_counter() - start
+                phase = 'run'
+                start = perf_counter()
+                interpreter.execute(compiled)
+            else:
+                interpreter.interpret(tokens)
+        except ScriptError as e:
+            self.print(e)
+        except KeyboardInterrupt:
+            # the engines write the variables back however a run ends
+            self.print("interrupted")
+        except Exception as e:
+            # a bug in an engine must not end the session and lose the variables
+            self.print(f"Internal error: {type(e).__name__}: {e}")
+        times[phase] = perf_counter() - start
+        if self.show_time:
+            self.print(f"[lex {lex_time * 1000:.3f}ms, compile {times['compile'] * 1000:.3f}ms, run {times['run'] * 1000:.3f}ms]")
+
+    def command(self, text):
+        name = text.split()[0]
+        if name == ":time":
+            self.show_time = not self.show_time
+            self.print(f"timing {'on' if self.show_time else 'off'}")
+        elif name == ":tokens":
+            self.show_tokens = not self.show_tokens
+            self.print(f"token output {'on' if self.show_tokens else 'off'}")
+        elif name == ":vars":
+            for key, value in self.interpreter.variables.items():
+                self.print(f"{key} = {value!r}")
+        elif name == ":reset":
+            self.interpreter.variables.clear()
+        elif name == ":help":
+            self.print(HELP)
+        elif name in (":quit", ":exit", ":q"):
+            return False
+        else:
+            self.print(f"Unknown command {name}, try :help")
+        return True
+
+    def loop(self):
+        try:
+            # line editing and history for input()
+            import readline
+        except ImportError:
+            pass
+        self.print('AhovaTheory REPL, :help for commands')
+        while True:
+            try:
+                line = input(self.prompt)
+            except EOFError:
+                self.print()
+                break
+            except KeyboardInterrupt:
+                # drop the unfinished input, like Python's REPL
+                self.print("\nKeyboardInterrupt")
+                self.lines = []
+                continue
+            if not self.feed(line):
+                break
+        return 0
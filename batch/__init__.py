@@ -0,0 +1 @@
+from .batch import *
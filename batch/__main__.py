@@ -0,0 +1,38 @@
+"""Run .at scripts in bulk: python -m batch PATH... [-o results.jsonl]"""
+import argparse
+import sys
+import time
+
+from interpreter.interpreter import ENGINES
+from optimizer.optimizer import LEVELS
+from .batch import run_batch, write_jsonl
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m batch", description="Run many .at scripts across all cores and write JSON Lines results.")
+    parser.add_argument("paths", nargs="+", help="script files, or directories to search for *.at files")
+    parser.add_argument("-o", "--output", help="JSON Lines file to write (default: stdout)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=None, help="scripts handed to a worker at a time (default: automatic)")
+    order = parser.add_mutually_exclusive_group()
+    order.add_argument("--ordered", dest="ordered", action="store_true", default=True, help="write results in input order (default)")
+    order.add_argument("--as-completed", dest="ordered", action="store_false", help="write each result as soon as its script finishes")
+    parser.add_argument("--engine", choices=ENGINES, default="ast")
+    parser.add_argument("-O", type=int, choices=LEVELS, default=0, dest="optimize", help="optimization level")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_batch(args.paths, jobs=args.jobs, chunksize=args.chunksize, ordered=args.ordered,
+                        engine=args.engine, optimize=args.optimize)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            succeeded, failed = write_jsonl(results, f)
+    else:
+        succeeded, failed = write_jsonl(results, sys.stdout)
+    elapsed = time.perf_counter() - start
+    print(f"{succeeded} succeeded, {failed} failed in {elapsed:.3f} seconds.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Run many independent .at scripts across a process pool.
+
+`run_batch()` yields one result dict per script as soon as it is
+available, either in input order or as the scripts complete, and
+`write_jsonl()` streams those results to a file one JSON object per
+line. A script that fails, or cannot be read, gets a result with
+`"ok": false` and its `error`; the rest of the batch carries on.
+"""
+import json
+import multiprocessing
+import os
+import time
+
+from lexer.lexer import ScriptError
+from interpreter.interpreter import Interpreter
+from interpreter.output import CollectorSink
+from runtime.values import to_json
+
+# upper bound for the automatic chunk size, so results keep streaming
+MAX_CHUNKSIZE = 64
+
+
+def find_scripts(paths):
+    """Expand `paths` into a list of script files; directories are searched
+    recursively for *.at files, in sorted order."""
+    scripts = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for root, dirs, files in os.walk(path):
+                found.extend(os.path.join(root, name) for name in files if name.endswith(".at"))
+            scripts.extend(sorted(found))
+        else:
+            scripts.append(path)
+    return scripts
+
+
+def run_file(path, engine="ast", optimize=0):
+    """Run one script file and return its result as a plain dict. Batches
+    are mostly run once, so scripts are not written to the compiled-script
+    cache."""
+    start = time.perf_counter()
+    interpreter = Interpreter(engine=engine, optimize=optimize, cache=False, output=CollectorSink())
+    result = {"path": path, "ok": True, "error": None}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            code = f.read()
+        interpreter.interpret_source(code)
+    except ScriptError as e:
+        result.update(ok=False, error=str(e))
+    except (OSError, UnicodeDecodeError) as e:
+        result.update(ok=False, error=f"Cannot read script: {e}")
+    except Exception as e:
+        result.update(ok=False, error=f"Internal error: {type(e).__name__}: {e}")
+    result["output"] = interpreter.output.getvalue()
+    result["variables"] = {name: to_json(value) for name, value in interpreter.variables.items()}
+    result["time"] = time.perf_counter() - start
+    return result
+
+
+def _run_task(task):
+    return run_file(*task)
+
+
+def default_chunksize(count, jobs):
+    # roughly four chunks per worker balances load against IPC overhead
+    return max(1, min(MAX_CHUNKSIZE, count // (jobs * 4)))
+
+
+def run_batch(paths, jobs=None, chunksize=None, ordered=True, engine="ast", optimize=0):
+    """Run every script in `paths` over `jobs` processes, yielding results.
+
+    With `ordered` results come back in input order; otherwise each one
+    is yielded as soon as its script finishes.
+    """
+    scripts = find_scripts(paths)
+    if not scripts:
+        return
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(scripts)))
+    tasks = [(path, engine, optimize) for path in scripts]
+
+    if jobs == 1:
+        for task in tasks:
+            yield _run_task(task)
+        return
+
+    chunksize = chunksize or default_chunksize(len(tasks), jobs)
+    with multiprocessing.Pool(jobs) as pool:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        yield from mapper(_run_task, tasks, chunksize)
+
+
+def write_jsonl(results, stream):
+    """Write each result as one JSON line as it arrives; returns the number
+    of scripts that succeeded and failed."""
+    succeeded = failed = 0
+    for result in results:
+        stream.write(json.dumps(result) + "\n")
+        stream.flush()
+        if result["ok"]:
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
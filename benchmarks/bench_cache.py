@@ -0,0 +1,54 @@
+"""Compiled-script cache benchmark.
+
+Runs a large generated script through `Interpreter.interpret_source` with
+the cache disabled, on a cold cache and on a warm cache, and reports how
+much of each run the front end takes.
+
+    python benchmarks/bench_cache.py [--statements 20000] [--engine vm]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import ScriptCache
+from interpreter import Interpreter
+
+STATEMENT = "let v{n} = ({n} + 3) * 2 - {n} % 7;\n"
+
+
+def timed_run(code, engine, cache):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Interpreter(engine=engine, cache=cache).interpret_source(code)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--statements", type=int, default=20000)
+    parser.add_argument("--engine", default="ast", choices=("ast", "vm", "py"))
+    args = parser.parse_args()
+
+    code = "".join(STATEMENT.format(n=n) for n in range(args.statements)) + "echo v0;\n"
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ScriptCache(directory)
+        uncached = timed_run(code, args.engine, False)
+        cold = timed_run(code, args.engine, cache)
+        warm = min(timed_run(code, args.engine, cache) for _ in range(3))
+
+    print(f"{args.statements} statements, {len(code) // 1024}KB, engine {args.engine}")
+    print(f"  no cache   {uncached:>8.3f}s")
+    print(f"  cold cache {cold:>8.3f}s")
+    print(f"  warm cache {warm:>8.3f}s  {uncached / warm:>5.1f}x faster")
+    print(f"  cache hits {cache.hits}, misses {cache.misses}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Loop-heavy benchmark comparing the interpreter engines.
+
+Runs the same script through every engine, checks they print the same
+output and reports the best time of each relative to the ast engine,
+the tree-walker the vm and py backends are meant to beat.
+
+    python benchmarks/bench_engines.py [--iterations 20000] [--repeat 3] [-O 2]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from interpreter import Interpreter, ENGINES
+
+# Sticks to constructs every engine runs, including the token engine.
+WORKLOAD = """let i = 0;
+let total = 0;
+let odd = 0;
+while i < {n} {{
+    let total = total + i * 2 - i / 4;
+    if i % 2 == 1 {{
+        let odd = odd + 1;
+    }}
+    let i = i + 1;
+}}
+for k in range(0, {n}) {{
+    let total = total - k % 7;
+}}
+echo total;
+echo f"odd {{odd}}";
+"""
+
+
+def run(engine, tokens, optimize):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        Interpreter(engine=engine, optimize=optimize).interpret(tokens)
+    return output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-O", "--optimize", type=int, default=0, choices=(0, 1, 2))
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=ENGINES)
+    args = parser.parse_args()
+
+    tokens = Lexer(WORKLOAD.format(n=args.iterations)).tokenize()
+    results = {}
+    outputs = {}
+    for engine in args.engines:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            outputs[engine] = run(engine, tokens, args.optimize)
+            best = min(best, time.perf_counter() - start)
+        results[engine] = best
+
+    if len(set(outputs.values())) > 1:
+        print("engines disagree on output:")
+        for engine, output in outputs.items():
+            print(f"  {engine}: {output!r}")
+        return 1
+
+    baseline = results.get("ast")
+    print(f"{args.iterations} iterations, best of {args.repeat}, -O{args.optimize}")
+    for engine, elapsed in results.items():
+        line = f"  {engine:<8} {elapsed:>8.3f}s"
+        if baseline:
+            line += f"  {baseline / elapsed:>5.1f}x vs ast"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Lexer scaling benchmark.
+
+Tokenizes generated scripts of doubling size and reports the time per KB.
+A linear tokenizer keeps that number flat as the input grows.
+
+    python benchmarks/bench_lexer.py [--max-kb 4096]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+
+SNIPPET = """let total = 0;
+let name = "World";
+while total < 10 {
+    let total = total + calc(2 * 3) % 4;
+    echo f"Hello {name} {total}";
+}
+for k in range(0, 3) {
+    if k == 1 { echo 'one'; } else { echo k - .5; }
+}
+let values = [1, 5, 3];
+"""
+
+
+def generate(size_kb):
+    repeat = max(1, size_kb * 1024 // len(SNIPPET))
+    return SNIPPET * repeat
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-kb", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'tokens':>9} {'tokenize':>10} {'ms/KB':>7}")
+    size_kb = 16
+    while size_kb <= args.max_kb:
+        code = generate(size_kb)
+        kb = len(code) / 1024
+        tokens = len(Lexer(code).tokenize())
+        fast = best_time(lambda: Lexer(code).tokenize(), args.repeat)
+        print(f"{size_kb:>6}KB {tokens:>9} {fast:>9.3f}s {fast * 1000 / kb:>7.3f}")
+        size_kb *= 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
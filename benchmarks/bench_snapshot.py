@@ -0,0 +1,81 @@
+"""Snapshot benchmark: restoring a prelude versus re-running it.
+
+Generates a prelude of `let` statements that build lookup lists, strings
+and constants, then times starting a run three ways: re-executing the
+prelude without the compiled-script cache, re-executing it with a warm
+cache, and restoring a snapshot taken after it.
+
+    python benchmarks/bench_snapshot.py [--statements 2000] [--size 1000] [--engine ast]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import ScriptCache
+from interpreter import Interpreter
+from snapshot import Snapshot, save_snapshot
+
+PRELUDE = (
+    "let table{n} = range(0, {size}) * {n} + 1;\n"
+    "let label{n} = \"entry \" + \"{n}\";\n"
+    "let scale{n} = {n} / 7;\n"
+)
+
+
+def build_prelude(statements, size):
+    return "".join(PRELUDE.format(n=n, size=size) for n in range(statements // 3))
+
+
+def median_time(function, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--statements", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=1000, help="items in each lookup list")
+    parser.add_argument("--engine", default="ast", choices=("ast", "vm", "py"))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    prelude = build_prelude(args.statements, args.size)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ScriptCache(directory)
+        path = os.path.join(directory, "prelude.snap")
+
+        def rerun(cache):
+            with contextlib.redirect_stdout(io.StringIO()):
+                Interpreter(engine=args.engine, cache=cache).interpret_source(prelude)
+
+        interpreter = Interpreter(engine=args.engine, cache=False)
+        interpreter.interpret_source(prelude)
+        save_snapshot(interpreter, path)
+
+        uncached = median_time(lambda: rerun(False), args.runs)
+        rerun(cache)
+        warm = median_time(lambda: rerun(cache), args.runs)
+        restored = median_time(lambda: Snapshot.load(path).restore(engine=args.engine, cache=False), args.runs)
+        size = os.path.getsize(path)
+
+    print(f"{args.statements} statements, lists of {args.size}, engine {args.engine}, median of {args.runs} runs")
+    print(f"  re-run, no cache   {uncached * 1000:>9.2f}ms")
+    print(f"  re-run, warm cache {warm * 1000:>9.2f}ms")
+    print(f"  snapshot restore   {restored * 1000:>9.2f}ms  {warm / restored:>6.1f}x faster than the warm re-run")
+    print(f"  snapshot size      {size / 1024:>9.1f}KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
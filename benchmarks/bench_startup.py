@@ -0,0 +1,86 @@
+"""Startup benchmark for the `ahova` command.
+
+Times fresh interpreter processes: a bare `python -c pass` baseline,
+importing the CLI module, and running a short script end to end. The
+script builds a small list, so a change that loads NumPy (or anything
+else heavy) for everyday scripts shows up. Exits non-zero when the run
+takes more than `--max-ms` over the baseline, so startup regressions
+fail CI instead of creeping in.
+
+    python benchmarks/bench_startup.py [--runs 20] [--max-ms 50] [--top 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = 'let greeting = "hello";\nlet counts = [1, 2, 3] * 2;\necho f"{greeting} world {counts}";\n'
+
+
+def time_command(args, runs, env):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def slowest_imports(module, top, env):
+    """The `top` modules with the highest cumulative import time."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, default=50.0, help="allowed script run time over bare python")
+    parser.add_argument("--top", type=int, default=10, help="show the slowest imports (0 to skip)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, AHOVA_NO_CACHE="1")
+    # installed copies run from __pycache__, so time that
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    with tempfile.NamedTemporaryFile("w", suffix=".at", delete=False) as f:
+        f.write(SCRIPT)
+    try:
+        # the first runs also write __pycache__, keep them out of the timing
+        time_command([sys.executable, "-m", "ahova", f.name], 2, env)
+        baseline = time_command([sys.executable, "-c", "pass"], args.runs, env)
+        imported = time_command([sys.executable, "-c", "import ahova.cli"], args.runs, env)
+        script = time_command([sys.executable, "-m", "ahova", f.name], args.runs, env)
+    finally:
+        os.unlink(f.name)
+
+    overhead = (script - baseline) * 1000
+    print(f"median of {args.runs} runs")
+    print(f"  python -c pass       {baseline * 1000:>8.1f}ms")
+    print(f"  import ahova.cli     {imported * 1000:>8.1f}ms  (+{(imported - baseline) * 1000:.1f}ms)")
+    print(f"  ahova script.at      {script * 1000:>8.1f}ms  (+{overhead:.1f}ms)")
+
+    if args.top:
+        print(f"\nslowest imports (cumulative):")
+        for cumulative, name in slowest_imports("ahova.cli", args.top, env):
+            print(f"  {cumulative / 1000:>8.1f}ms {name}")
+
+    if overhead > args.max_ms:
+        print(f"\nstartup overhead {overhead:.1f}ms exceeds the {args.max_ms:g}ms bound", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
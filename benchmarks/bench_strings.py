@@ -0,0 +1,60 @@
+"""String-building benchmark: accumulate many pieces with `s = s + ...`.
+
+Runs a loop that appends `--pieces` short strings to one variable and
+compares ropes against plain string concatenation (ropes disabled by
+raising the threshold), per engine.
+
+    python benchmarks/bench_strings.py [--pieces 100000] [--engines ast vm]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runtime.strings
+from lexer import Lexer
+from interpreter import Interpreter, CollectorSink
+
+WORKLOAD = """let report = "";
+for i in range(0, {n}) {{
+    let report = report + "row " + "data;";
+}}
+echo len(report);
+"""
+
+
+def run(engine, tokens):
+    interpreter = Interpreter(engine=engine, cache=False, output=CollectorSink())
+    start = time.perf_counter()
+    interpreter.interpret(tokens)
+    elapsed = time.perf_counter() - start
+    return elapsed, interpreter.output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pieces", type=int, default=100000)
+    parser.add_argument("--engines", nargs="+", default=["ast", "vm"], choices=("ast", "vm", "py"))
+    args = parser.parse_args()
+
+    tokens = Lexer(WORKLOAD.format(n=args.pieces)).tokenize()
+    threshold = runtime.strings.ROPE_THRESHOLD
+    print(f"{args.pieces} appends, {args.pieces * 13 // 1024}KB result")
+    for engine in args.engines:
+        rope_time, rope_output = run(engine, tokens)
+        runtime.strings.ROPE_THRESHOLD = float("inf")
+        try:
+            plain_time, plain_output = run(engine, tokens)
+        finally:
+            runtime.strings.ROPE_THRESHOLD = threshold
+        if rope_output != plain_output:
+            print(f"  {engine}: output differs: {rope_output!r} vs {plain_output!r}")
+            return 1
+        print(f"  {engine:<6} rope {rope_time:>8.3f}s  plain {plain_time:>8.3f}s  {plain_time / rope_time:>6.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Token memory benchmark.
+
+Measures the bytes held per token for a generated script, for the current
+`__slots__` Token and for the dict-backed Token the lexer used before.
+
+    python benchmarks/bench_tokens.py [--size-kb 1024]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from bench_lexer import generate
+
+
+class DictToken:
+    """The token layout before __slots__: an instance dict per token plus
+    the attributes the lexer set on it."""
+
+    def __init__(self, type, value, real_type="None", options={}):
+        self.type = type
+        self.value = value
+        self.options = options
+        self.i = None
+        self.match = None
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tokens = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return tokens, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-kb", type=int, default=1024)
+    args = parser.parse_args()
+
+    code = generate(args.size_kb)
+    tokens, slots_bytes = measure(lambda: Lexer(code).tokenize())
+
+    def rebuild_with_dicts():
+        rebuilt = []
+        for token in tokens:
+            old = DictToken(token.type, token.value)
+            old.i = token.i
+            old.match = token.match
+            rebuilt.append(old)
+        return rebuilt
+
+    # both rebuilds reuse the existing token values, so they count only the
+    # token objects and the list holding them
+    _, dict_bytes = measure(rebuild_with_dicts)
+    _, slots_only = measure(lambda: [type(t)(t.type, t.value, t.i, t.offset) for t in tokens])
+
+    count = len(tokens)
+    print(f"{count} tokens from {args.size_kb}KB of source")
+    print(f"  tokenize() total   {slots_bytes / count:>7.1f} bytes/token (objects + values)")
+    print(f"  dict-backed Token  {dict_bytes / count:>7.1f} bytes/token")
+    print(f"  __slots__ Token    {slots_only / count:>7.1f} bytes/token")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
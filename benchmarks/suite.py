@@ -0,0 +1,128 @@
+"""Benchmark suite with regression tracking.
+
+Generates each workload from `workloads.py`, then times `Lexer.tokenize`
+and `Interpreter.interpret` separately, with warmup runs and repetitions.
+Results can be saved as JSON and compared against a stored baseline; any
+phase whose median slows down by more than the threshold is flagged and
+makes the run exit with status 1.
+
+    python benchmarks/suite.py --save baseline.json
+    python benchmarks/suite.py --baseline baseline.json [--threshold 0.1]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from interpreter import Interpreter, CollectorSink, ENGINES
+from workloads import UNSUPPORTED, WORKLOADS, generate
+
+
+def measure(func, warmup, repeat):
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "repeat": repeat,
+    }
+
+
+def run_workload(name, args):
+    code = generate(name, args.scale)
+    tokens = Lexer(code).tokenize()
+
+    def interpret():
+        interpreter = Interpreter(engine=args.engine, optimize=args.optimize, cache=False, output=CollectorSink())
+        interpreter.interpret(tokens)
+
+    return {
+        f"{name}/tokenize": measure(lambda: Lexer(code).tokenize(), args.warmup, args.repeat),
+        f"{name}/interpret": measure(interpret, args.warmup, args.repeat),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return (name, old, new, change) for every phase slower than allowed."""
+    regressions = []
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        change = stats["median"] / old["median"] - 1
+        if change > threshold:
+            regressions.append((name, old["median"], stats["median"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=list(WORKLOADS), help="workloads to run (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for every workload size")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--engine", default="ast", choices=ENGINES)
+    parser.add_argument("-O", "--optimize", type=int, default=0, choices=(0, 1, 2))
+    parser.add_argument("--save", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved JSON run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown of the median (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only or WORKLOADS:
+        if name in UNSUPPORTED.get(args.engine, ()):
+            print(f"{name:<26} skipped, not supported by the {args.engine} engine")
+            continue
+        for phase, stats in run_workload(name, args).items():
+            results[phase] = stats
+            print(f"{phase:<26} median {stats['median'] * 1000:>9.2f}ms  "
+                  f"min {stats['min'] * 1000:>9.2f}ms  stdev {stats['stdev'] * 1000:>7.2f}ms")
+
+    if args.save:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "engine": args.engine,
+                "optimize": args.optimize,
+                "scale": args.scale,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        meta = stored.get("meta", {})
+        for key in ("engine", "optimize", "scale"):
+            if key in meta and meta[key] != getattr(args, key):
+                print(f"\nwarning: baseline was recorded with {key}={meta[key]!r}, this run uses {getattr(args, key)!r}")
+        regressions = compare(results, stored["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for name, old, new, change in regressions:
+                print(f"  {name:<26} {old * 1000:>9.2f}ms -> {new * 1000:>9.2f}ms  (+{change:.0%})")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
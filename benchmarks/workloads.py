@@ -0,0 +1,104 @@
+"""Generators for parameterized .at benchmark workloads.
+
+Each generator takes a size and returns AhovaTheory source. `WORKLOADS`
+maps a workload name to its generator and default size.
+"""
+
+
+def flat_script(statements):
+    """A long script with no control flow, dominated by lexing."""
+    lines = []
+    for n in range(statements):
+        lines.append(f"let v{n} = ({n} + 3) * 2 - {n} % 7;")
+        lines.append(f'echo f"v{n} is {{v{n}}}";')
+    return "\n".join(lines) + "\n"
+
+
+def nested_if(depth):
+    """`depth` levels of nested if/else, run over a loop."""
+    body = "let hits = hits + 1;"
+    for level in range(depth):
+        body = f"if k % {level + 2} < {level + 3} {{ {body} }} else {{ let misses = misses + 1; }}"
+    return f"let hits = 0;\nlet misses = 0;\nfor k in range(0, 200) {{\n{body}\n}}\necho hits;\n"
+
+
+def while_loop(iterations):
+    return f"""let i = 0;
+let total = 0;
+while i < {iterations} {{
+    let total = total + i * 2 - i % 3;
+    let i = i + 1;
+}}
+echo total;
+"""
+
+
+def for_range(iterations):
+    return f"""let total = 0;
+for i in range(0, {iterations}) {{
+    let total = total + i * 2 - i % 3;
+}}
+echo total;
+"""
+
+
+def fstring_echo(iterations):
+    return f"""let name = "bench";
+for i in range(0, {iterations}) {{
+    echo f"{{name}} line {{i}} of {iterations}";
+}}
+"""
+
+
+def list_literal(items):
+    values = ", ".join(str(n % 97) for n in range(items))
+    return f"""let values = [{values}];
+let total = 0;
+for v in values {{
+    let total = total + v;
+}}
+echo total;
+"""
+
+
+def vector_math(items):
+    """Whole-list arithmetic and reductions, with no statement-level loop."""
+    return f"""let xs = range(0, {items});
+let ys = xs * 3 + 7;
+echo sum(ys % 11);
+echo max(ys) - min(xs);
+echo len(ys);
+"""
+
+
+def string_builder(pieces):
+    """A string accumulated piece by piece in a loop."""
+    return f"""let report = "";
+for i in range(0, {pieces}) {{
+    let report = report + "row " + "data;";
+}}
+echo len(report);
+"""
+
+
+WORKLOADS = {
+    "flat_script": (flat_script, 5000),
+    "nested_if": (nested_if, 60),
+    "while_loop": (while_loop, 50000),
+    "for_range": (for_range, 50000),
+    "fstring_echo": (fstring_echo, 30000),
+    "list_literal": (list_literal, 20000),
+    "vector_math": (vector_math, 1000000),
+    "string_builder": (string_builder, 50000),
+}
+
+# Workloads an engine cannot run: the tokens engine has no builtin calls
+# or list operators
+UNSUPPORTED = {
+    "tokens": ("vector_math", "string_builder"),
+}
+
+
+def generate(name, scale=1.0):
+    generator, size = WORKLOADS[name]
+    return generator(max(1, int(size * scale)))
@@ -0,0 +1,160 @@
+import os
+import sys
+
+# Bump when the pickled AST or bytecode layout changes incompatibly.
+FORMAT_VERSION = 1
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "ahova")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Source files whose contents decide what the front end produces.
+FRONT_END_MODULES = (
+    ("lexer", "lexer.py"),
+    ("parser", "nodes.py"),
+    ("parser", "parser.py"),
+    ("parser", "resolver.py"),
+    ("optimizer", "optimizer.py"),
+    ("vm", "opcodes.py"),
+    ("vm", "compiler.py"),
+    ("codegen", "codegen.py"),
+)
+
+_engine_version = None
+
+def source_fingerprint(root, modules=FRONT_END_MODULES):
+    """Hash of the size and modification time of the front-end sources
+    under `root`. Like `__pycache__`, this stats the files instead of
+    reading them, so a run with the cache does not read the front end."""
+    import hashlib
+    digest = hashlib.sha256(f"{FORMAT_VERSION}:{sys.version_info[:2]}".encode())
+    for package, module in modules:
+        stat = os.stat(os.path.join(root, package, module))
+        digest.update(f"{module}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def engine_version():
+    """Fingerprint of the front-end sources, so editing them invalidates
+    everything compiled by the old version."""
+    global _engine_version
+    if _engine_version is None:
+        _engine_version = source_fingerprint(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return _engine_version
+
+
+class ScriptCache:
+    """On-disk cache of compiled scripts, in the spirit of `__pycache__`.
+
+    Entries are pickles named by a hash of the source, the engine version
+    and the compile options, so changing any of them misses instead of
+    returning a stale entry. Reading an entry refreshes its mtime; once the
+    directory grows past `max_bytes` the least recently used entries are
+    deleted. The directory is only scanned for that when a running
+    estimate of its size, kept from the writes of this process, passes
+    the limit.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or os.environ.get("AHOVA_CACHE_DIR") or DEFAULT_DIRECTORY
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # estimated bytes in the directory, None until the first write
+        self.size = None
+
+    def key(self, source, *options):
+        import hashlib
+        digest = hashlib.sha256(engine_version().encode())
+        digest.update(repr(options).encode())
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+    def get(self, key):
+        """Return the cached object for `key`, or None on a miss."""
+        import pickle
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # truncated or from an incompatible build; drop it and recompile
+            self.remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        import pickle
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                written = f.tell()
+            os.replace(temp, path)
+        except (OSError, pickle.PicklingError, RecursionError):
+            self.remove(temp)
+            return
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += written
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(".pickle"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Delete least recently used entries until the directory fits in
+        `max_bytes`."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                self.remove(path)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        self.size = total
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self.remove(path)
+        self.size = 0
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def default_cache():
+    """The shared cache, or None when AHOVA_NO_CACHE is set."""
+    if os.environ.get("AHOVA_NO_CACHE"):
+        return None
+    return ScriptCache()
@@ -0,0 +1 @@
+from .codegen import *
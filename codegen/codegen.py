@@ -0,0 +1,350 @@
+"""Python-source backend: compiles a resolved `Program` into one Python
+function with `compile()`, so loops, branches and arithmetic run as
+native CPython code.
+
+Variables become locals of the generated function, loaded from the slot
+list on entry and written back on exit. Arithmetic and comparisons on two
+numbers run inline as Python operators; anything else (lists, strings,
+division by zero) falls back to the helpers below, which follow the
+Evaluator's rules and error messages exactly.
+
+A program CPython refuses to compile, such as loops nested deeper than
+its static block limit, is kept as an AST and run by the Evaluator.
+"""
+import marshal
+import math
+from types import FunctionType
+
+from lexer.lexer import ScriptError
+from parser.nodes import *
+from parser.resolver import UNBOUND, load_slots, store_slots
+from runtime.values import BUILTINS, LIST_TYPES, elementwise, iterate, make_list, negate, operand_error, range_bounds, type_name
+from runtime.strings import STRING_TYPES, concat
+
+# marks an empty Hoisted cache variable
+UNSET = object()
+
+# operand types the inline fast paths handle
+NUMBER_TYPES = frozenset((int, float, bool))
+
+
+# Runtime helpers called from generated code
+
+def error(i, message):
+    raise ScriptError(f"Runtime Error at token {i}: {message}")
+
+
+def undefined(i, name):
+    error(i, f"Undefined variable '{name}'")
+
+
+def undefined_in_fstring(i, name):
+    error(i, f"Undefined variable '{name}' in f-string")
+
+
+def check_list(i, value):
+    if type(value) not in LIST_TYPES:
+        error(i, f"Expected list, got {type_name(value)}")
+    return iterate(value)
+
+
+def apply_elementwise(i, op, left, right):
+    try:
+        return elementwise(op, left, right)
+    except ZeroDivisionError:
+        error(i, "Division by zero")
+    except ValueError as e:
+        error(i, str(e))
+
+
+def binop(i, op, left, right):
+    try:
+        if type(left) in LIST_TYPES or type(right) in LIST_TYPES:
+            return apply_elementwise(i, op, left, right)
+        if op == 'ADD' and type(left) in STRING_TYPES:
+            return concat(left, right)
+        if op == 'DIV' or op == 'MOD':
+            if right == 0:
+                error(i, "Division by zero")
+            return left / right if op == 'DIV' else left % right
+        return BINARY_OPS[op](left, right)
+    except TypeError:
+        error(i, operand_error(SYMBOLS[op], left, right))
+
+
+def compare(i, op, left, right):
+    try:
+        if type(left) in LIST_TYPES or type(right) in LIST_TYPES:
+            return apply_elementwise(i, op, left, right)
+        return COMPARISONS[op](left, right)
+    except TypeError:
+        error(i, operand_error(SYMBOLS[op], left, right))
+
+
+def negative(i, value):
+    try:
+        return negate(value)
+    except TypeError:
+        error(i, operand_error('-', value))
+
+
+def call(i, name, *args):
+    try:
+        return BUILTINS[name](*args)
+    except (TypeError, ValueError, OverflowError) as e:
+        error(i, f"{name}(): {e}")
+
+
+def loop_range(i, start, end):
+    try:
+        return range(*range_bounds(start, end))
+    except (TypeError, ValueError) as e:
+        error(i, f"range(): {e}")
+
+
+HELPERS = {
+    'UNBOUND': UNBOUND,
+    'UNSET': UNSET,
+    'NUMBERS': NUMBER_TYPES,
+    'undefined': undefined,
+    'undefined_in_fstring': undefined_in_fstring,
+    'check_list': check_list,
+    'binop': binop,
+    'compare': compare,
+    'call': call,
+    'loop_range': loop_range,
+    'make_list': make_list,
+    'negative': negative,
+}
+
+
+class PyCode:
+    """A program compiled to Python source, plus what running it needs.
+
+    The function is built from `source` on first use. Pickling keeps the
+    compiled bytecode, marshalled, instead of the function, so programs
+    loaded from the script cache skip `compile()` as well. `program` is
+    only set when the source could not be compiled.
+    """
+
+    def __init__(self, source, constants, names, program=None):
+        self.source = source
+        self.constants = constants
+        self.names = names
+        self.program = program
+        self.bytecode = None
+        self.function = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.function is not None:
+            state['bytecode'] = marshal.dumps(self.function.__code__)
+        state['function'] = None
+        return state
+
+    def load(self):
+        if self.function is None:
+            namespace = dict(HELPERS)
+            namespace.update(self.constants)
+            if self.bytecode is not None:
+                self.function = FunctionType(marshal.loads(self.bytecode), namespace, 'run')
+            else:
+                exec(compile(self.source, '<ahova>', 'exec'), namespace)
+                self.function = namespace['run']
+        return self.function
+
+    def run(self, interpreter):
+        if self.program is not None:
+            from interpreter.evaluator import Evaluator
+            return Evaluator(interpreter).run(self.program)
+        function = self.load()
+        slots = load_slots(self.names, interpreter.variables)
+        try:
+            function(slots, interpreter.output.write)
+        finally:
+            store_slots(self.names, slots, interpreter.variables)
+        return interpreter.variables
+
+
+class CodeGenerator:
+    """Writes the Python source for a resolved `Program`.
+
+    Tracks which slots are definitely assigned at each point, so reads of
+    variables that cannot be unbound skip the undefined-variable check.
+    """
+
+    def __init__(self, known_names=()):
+        self.known_names = known_names
+        self.lines = []
+        self.depth = 0
+        self.constants = {}
+        self.temps = 0
+        self.bound = set()
+
+    def generate(self, program):
+        names = program.names
+        self.bound = {slot for slot, name in enumerate(names) if name in self.known_names}
+        self.depth = 1
+        self.emit_line('def run(slots, write):')
+        self.depth = 2
+        variables = ''.join(f'v{slot}, ' for slot in range(len(names)))
+        if variables:
+            self.emit_line(f'{variables}= slots')
+        for slot in range(program.cache_size):
+            self.emit_line(f'c{slot} = UNSET')
+        self.emit_line('try:')
+        self.depth = 3
+        self.block(program.body)
+        self.depth = 2
+        self.emit_line('finally:')
+        self.depth = 3
+        self.emit_line(f'slots[:] = [{variables}]' if variables else 'pass')
+        # the function body starts at depth 1, shift everything left
+        source = '\n'.join(line[4:] for line in self.lines) + '\n'
+        return PyCode(source, self.constants, names)
+
+    def emit_line(self, text):
+        self.lines.append('    ' * self.depth + text)
+
+    def constant(self, value):
+        name = f'k{len(self.constants)}'
+        self.constants[name] = value
+        return name
+
+    def temp(self):
+        self.temps += 1
+        return f't{self.temps}'
+
+    # Statements
+
+    def block(self, body):
+        if not body:
+            self.emit_line('pass')
+        for node in body:
+            self.statement(node)
+
+    def nested_block(self, body):
+        self.depth += 1
+        self.block(body)
+        self.depth -= 1
+
+    def statement(self, node):
+        if isinstance(node, Let):
+            self.emit_line(f'v{node.slot} = {self.expression(node.value)}')
+            self.bound.add(node.slot)
+
+        elif isinstance(node, Echo):
+            self.emit_line(f'write(str({self.expression(node.value)}) + "\\n")')
+
+        elif isinstance(node, If):
+            self.emit_line(f'if {self.expression(node.condition)}:')
+            before = set(self.bound)
+            self.nested_block(node.body)
+            after_body = self.bound
+            self.bound = set(before)
+            if node.orelse:
+                self.emit_line('else:')
+                self.nested_block(node.orelse)
+            self.bound = after_body & self.bound
+
+        elif isinstance(node, While):
+            self.clear_hoisted(node)
+            self.emit_line(f'while {self.expression(node.condition)}:')
+            self.loop_body(node.body)
+
+        elif isinstance(node, ForRange):
+            start = self.expression(node.start)
+            end = self.expression(node.end)
+            self.clear_hoisted(node)
+            self.emit_line(f'for v{node.slot} in loop_range({node.i}, {start}, {end}):')
+            self.loop_body(node.body, node.slot)
+
+        elif isinstance(node, ForIn):
+            iterable = self.expression(node.iterable)
+            self.clear_hoisted(node)
+            self.emit_line(f'for v{node.slot} in check_list({node.i}, {iterable}):')
+            self.loop_body(node.body, node.slot)
+
+    def clear_hoisted(self, node):
+        for slot in node.hoisted:
+            self.emit_line(f'c{slot} = UNSET')
+
+    def loop_body(self, body, slot=None):
+        # the body may run zero times, so nothing it assigns is definite after it
+        before = set(self.bound)
+        if slot is not None:
+            self.bound.add(slot)
+        self.nested_block(body)
+        self.bound = before
+
+    # Expressions
+
+    def expression(self, node):
+        if isinstance(node, Const):
+            value = node.value
+            if type(value) in (int, str, bool) or (type(value) is float and math.isfinite(value)):
+                return repr(value)
+            return self.constant(value)
+
+        if isinstance(node, Name):
+            return self.read(node.slot, node.name, node.i, 'undefined')
+
+        if isinstance(node, FString):
+            values = ', '.join(self.read(slot, name, node.i, 'undefined_in_fstring')
+                               for slot, name in zip(node.slots, node.template.names))
+            return f'{self.constant(node.template)}.render(({values}{"," if len(node.slots) == 1 else ""}))'
+
+        if isinstance(node, ListLiteral):
+            return f'make_list([{", ".join(self.expression(item) for item in node.items)}])'
+
+        if isinstance(node, UnaryOp):
+            operand = self.expression(node.operand)
+            return f'({operand})' if node.op == 'ADD' else f'negative({node.i}, {operand})'
+
+        if isinstance(node, BinOp):
+            return self.binary(node, 'binop')
+
+        if isinstance(node, Compare):
+            if node.op in ('EQ', 'NEQ'):
+                return f'({self.expression(node.left)} {SYMBOLS[node.op]} {self.expression(node.right)})'
+            return self.binary(node, 'compare')
+
+        if isinstance(node, Call):
+            args = ''.join(f', {self.expression(arg)}' for arg in node.args)
+            return f'call({node.i}, {node.name!r}{args})'
+
+        if isinstance(node, Hoisted):
+            cache = f'c{node.slot}'
+            return f'({cache} if {cache} is not UNSET else ({cache} := {self.expression(node.value)}))'
+
+        raise TypeError(f"Cannot generate code for {type(node).__name__}")
+
+    def read(self, slot, name, i, helper):
+        if slot in self.bound:
+            return f'v{slot}'
+        return f'(v{slot} if v{slot} is not UNBOUND else {helper}({i}, {name!r}))'
+
+    def binary(self, node, helper):
+        """Inline operator for two numbers, `helper` for everything else.
+
+        Both operands are evaluated once, left first, into temporaries;
+        `&` rather than `and` makes sure the right one always is.
+        """
+        left, right = self.temp(), self.temp()
+        check = f'(type({left} := {self.expression(node.left)}) in NUMBERS) & (type({right} := {self.expression(node.right)}) in NUMBERS)'
+        if node.op == 'DIV' or node.op == 'MOD':
+            # a zero divisor takes the helper, which reports it
+            check = f'{check} and {right}'
+        fast = f'{left} {SYMBOLS[node.op]} {right}'
+        return f'({fast} if {check} else {helper}({node.i}, {node.op!r}, {left}, {right}))'
+
+
+def generate(program, known_names=()):
+    """Compile `program` to a `PyCode`, falling back to keeping the AST
+    when CPython cannot compile the generated source."""
+    try:
+        code = CodeGenerator(known_names).generate(program)
+        code.load()
+    except (SyntaxError, RecursionError, MemoryError):
+        return PyCode(None, {}, program.names, program)
+    return code
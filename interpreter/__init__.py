@@ -1 +1,2 @@
 from .interpreter import *
+from .output import *
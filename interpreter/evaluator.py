@@ -0,0 +1,200 @@
+from lexer.lexer import ScriptError
+from parser.nodes import *
+from parser.resolver import UNBOUND, load_slots, store_slots
+from runtime.values import BUILTINS, LIST_TYPES, iterate, make_list, negate, operand_error, range_bounds, type_name
+from .specialize import specialize_binop, specialize_compare
+
+# marks an empty Hoisted cache slot
+UNSET = object()
+
+class Evaluator:
+    """Executes a resolved `Program` by walking its AST.
+
+    Variables live in a list indexed by the slots the resolver assigned.
+    They are loaded from the owning interpreter's `variables` dict before
+    the run and written back after it, so callers see the same state
+    whichever engine ran the script.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.variables = interpreter.variables
+        self.write = interpreter.output.write
+        self.specialization = interpreter.specialization
+        self.slots = []
+        self.cache = []
+        self.statements = {
+            Let: self.exec_let,
+            Echo: self.exec_echo,
+            If: self.exec_if,
+            While: self.exec_while,
+            ForRange: self.exec_for_range,
+            ForIn: self.exec_for_in,
+        }
+        self.expressions = {
+            Const: self.eval_const,
+            FString: self.eval_fstring,
+            Name: self.eval_name,
+            ListLiteral: self.eval_list,
+            UnaryOp: self.eval_unary,
+            BinOp: self.eval_binop,
+            Compare: self.eval_compare,
+            Call: self.eval_call,
+            Hoisted: self.eval_hoisted,
+        }
+
+    def error(self, node, message):
+        raise ScriptError(f"Runtime Error at token {node.i}: {message}")
+
+    def run(self, program):
+        self.slots = load_slots(program.names, self.variables)
+        self.cache = [UNSET] * program.cache_size
+        try:
+            self.exec_block(program.body)
+        finally:
+            store_slots(program.names, self.slots, self.variables)
+        return self.variables
+
+    # Statements
+
+    def exec_block(self, body):
+        statements = self.statements
+        for node in body:
+            statements[type(node)](node)
+
+    def exec_let(self, node):
+        self.slots[node.slot] = self.evaluate(node.value)
+
+    def exec_echo(self, node):
+        self.write(str(self.evaluate(node.value)) + "\n")
+
+    def exec_if(self, node):
+        if self.evaluate(node.condition):
+            self.exec_block(node.body)
+        elif node.orelse:
+            self.exec_block(node.orelse)
+
+    def clear_hoisted(self, node):
+        for slot in node.hoisted:
+            self.cache[slot] = UNSET
+
+    def exec_while(self, node):
+        self.clear_hoisted(node)
+        condition = node.condition
+        body = node.body
+        while self.evaluate(condition):
+            self.exec_block(body)
+
+    def exec_for_range(self, node):
+        self.clear_hoisted(node)
+        start, end = self.loop_bounds(node)
+        slots = self.slots
+        slot = node.slot
+        body = node.body
+        for i in range(start, end):
+            slots[slot] = i
+            self.exec_block(body)
+
+    def loop_bounds(self, node):
+        try:
+            return range_bounds(self.evaluate(node.start), self.evaluate(node.end))
+        except (TypeError, ValueError) as e:
+            self.error(node, f"range(): {e}")
+
+    def exec_for_in(self, node):
+        self.clear_hoisted(node)
+        value = self.evaluate(node.iterable)
+        if type(value) not in LIST_TYPES:
+            self.error(node, f"Expected list, got {type_name(value)}")
+        slots = self.slots
+        slot = node.slot
+        body = node.body
+        for item in iterate(value):
+            slots[slot] = item
+            self.exec_block(body)
+
+    # Expressions
+
+    def evaluate(self, node):
+        return self.expressions[type(node)](node)
+
+    def eval_const(self, node):
+        return node.value
+
+    def eval_fstring(self, node):
+        slots = self.slots
+        values = []
+        for slot, name in zip(node.slots, node.template.names):
+            value = slots[slot]
+            if value is UNBOUND:
+                self.error(node, f"Undefined variable '{name}' in f-string")
+            values.append(value)
+        return node.template.render(values)
+
+    def eval_name(self, node):
+        value = self.slots[node.slot]
+        if value is UNBOUND:
+            self.error(node, f"Undefined variable '{node.name}'")
+        return value
+
+    def eval_list(self, node):
+        return make_list([self.evaluate(item) for item in node.items])
+
+    def eval_unary(self, node):
+        value = self.evaluate(node.operand)
+        if node.op == 'ADD':
+            return value
+        try:
+            return negate(value)
+        except TypeError:
+            self.error(node, operand_error('-', value))
+
+    def eval_binop(self, node):
+        return self.binop(node, self.evaluate(node.left), self.evaluate(node.right))
+
+    def binop(self, node, left, right):
+        """Apply `node`'s operator through its inline cache."""
+        cache = node.cache
+        try:
+            if cache is not None and cache[0] is type(left) and cache[1] is type(right):
+                self.specialization.hits += 1
+                return cache[2](left, right)
+            return self.specialize(node, left, right, specialize_binop)
+        except TypeError:
+            self.error(node, operand_error(SYMBOLS[node.op], left, right))
+
+    def eval_compare(self, node):
+        left = self.evaluate(node.left)
+        right = self.evaluate(node.right)
+        cache = node.cache
+        try:
+            if cache is not None and cache[0] is type(left) and cache[1] is type(right):
+                self.specialization.hits += 1
+                return cache[2](left, right)
+            return self.specialize(node, left, right, specialize_compare)
+        except TypeError:
+            self.error(node, operand_error(SYMBOLS[node.op], left, right))
+
+    def specialize(self, node, left, right, specializer):
+        """Inline cache miss: build the function for these operand types,
+        remember it on the node and apply it."""
+        stats = self.specialization
+        stats.misses += 1
+        if node.cache is not None:
+            stats.respecializations += 1
+        function = specializer(node, type(left), type(right), LIST_TYPES)
+        node.cache = (type(left), type(right), function)
+        return function(left, right)
+
+    def eval_call(self, node):
+        args = [self.evaluate(arg) for arg in node.args]
+        try:
+            return BUILTINS[node.name](*args)
+        except (TypeError, ValueError, OverflowError) as e:
+            self.error(node, f"{node.name}(): {e}")
+
+    def eval_hoisted(self, node):
+        value = self.cache[node.slot]
+        if value is UNSET:
+            value = self.cache[node.slot] = self.evaluate(node.value)
+        return value
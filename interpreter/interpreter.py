@@ -1,23 +1,65 @@
-from colorama import Fore, init
-from sys import stdout
-from lexer.lexer import ScriptError
+from lexer.lexer import Lexer, ScriptError, Token
+from parser.parser import Parser
+from parser.resolver import resolve
+from optimizer.optimizer import optimize
+from .evaluator import Evaluator
+from .output import BufferedSink
+from .specialize import SpecializationStats
 
-import re
-
-# Initialize colorama
-init(convert=False)
-
-class Token:
-    def __init__(self, type, value, real_type="None", options={}):
-        self.type = type
-        self.value = value
-        self.options = options
-
-    def __repr__(self):
-        return f'Token({self.type}, {self.value})'
+# "ast" parses once and walks the tree; "vm" compiles the tree to bytecode
+# for the stack VM; "py" compiles it to Python source and runs that as a
+# native function; "tokens" is the original interpreter, executing straight
+# from the token list.
+#
+# The tokens engine remains the reference for the core language: numbers,
+# strings, variables, f-strings, if/while/for and list literals must run
+# the same on every engine. The other engines go past it in two places.
+# They add builtin calls (range, len, sum, ...). They also give lists
+# operators, which the tokens engine rejects as syntax errors. Those
+# operators work elementwise, so `[1, 2] + [3, 4]` is `[4, 6]` and
+# `[1, 2] * 2` is `[2, 4]`, never a concatenation or repetition. Tests of
+# those features are skipped for the tokens engine.
+ENGINES = ('ast', 'vm', 'py', 'tokens')
 
 class Interpreter:
-    def __init__(self):
+    def __init__(self, engine="ast", optimize=0, cache=False, output=None, profile=False, profile_output=None,
+                 memory_limit=None, memory_report=False):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+        if profile and engine != 'ast':
+            raise ValueError("Profiling is only supported by the ast engine")
+        if (memory_limit is not None or memory_report) and engine != 'ast':
+            raise ValueError("Memory tracking is only supported by the ast engine")
+        if profile and (memory_limit is not None or memory_report):
+            raise ValueError("Profiling and memory tracking cannot be combined")
+        self.engine = engine
+        # optimization level for the AST before it runs (ignored by "tokens")
+        self.optimize = optimize
+        # compiled-script cache for interpret_source, off by default: True
+        # uses the shared on-disk cache, or pass a ScriptCache
+        if cache is True:
+            from cache.cache import default_cache
+            cache = default_cache()
+        self.cache = cache or None
+        # where echo writes; defaults to a buffered writer on sys.stdout
+        self.output = output if output is not None else BufferedSink()
+        # per-statement profile, reported to stderr after each run; the
+        # collapsed stacks also go to profile_output when it is set
+        self.profiler = None
+        if profile:
+            from .profiler import Profiler
+            self.profiler = Profiler()
+        self.profile_output = profile_output
+        # approximate bytes held by variables, checked against
+        # memory_limit on every store and reported to stderr after each
+        # run with memory_report
+        self.memory = None
+        if memory_limit is not None or memory_report:
+            from .memory import MemoryTracker
+            self.memory = MemoryTracker(memory_limit)
+        self.memory_report = memory_report
+        # inline cache counters of the ast engine, across all runs
+        self.specialization = SpecializationStats()
         self.variables = {}
         self.pos = 0
         self.tokens = []
@@ -60,17 +102,13 @@ class Interpreter:
             
         elif token.type == 'FSTRING':
             self.advance()
-            result = token.value
-
-            # Regular expression to find placeholders within curly braces
-            matches = re.findall(r"{(.*?)}", result)
-
-            for match in matches:
-                if match not in self.variables:
-                    self.error(f"Undefined variable '{match}' in f-string")
-                result = result.replace("{" + match + "}", str(self.variables[match]))
-
-            return result
+            template = token.value
+            values = []
+            for name in template.names:
+                if name not in self.variables:
+                    self.error(f"Undefined variable '{name}' in f-string")
+                values.append(self.variables[name])
+            return template.render(values)
             
         elif token.type == 'IDENTIFIER':
             self.advance()
@@ -116,6 +154,8 @@ class Interpreter:
                     self.error("Division by zero")
                 left /= right
             elif op.type == 'MOD':
+                if right == 0:
+                    self.error("Division by zero")
                 left %= right
                 
         return left
@@ -188,7 +228,7 @@ class Interpreter:
         elif token.type == 'ECHO':
             self.advance()
             value = self.evaluate_expression()
-            print(value)
+            self.output.write(str(value) + "\n")
             self.expect('SEMICOLON')
             
         elif token.type == 'IF':
@@ -207,7 +247,6 @@ class Interpreter:
                     self.expect('RGROUP')
             else:
                 self.skip_block()
-                self.deadvance()
                 self.expect('RGROUP')
                 
                 if self.peek().type == 'ELSE':
@@ -234,7 +273,6 @@ class Interpreter:
             if self.peek().type == 'LGROUP':
                 self.expect('LGROUP')
                 self.skip_block()
-                self.deadvance()
                 self.expect('RGROUP')
             
         elif token.type == 'FOR':
@@ -285,7 +323,13 @@ class Interpreter:
                     self.variables[var_name] = i
                     self.pos = block_start
                     self.execute_block()
-                
+
+            else:
+                self.error(f"Unexpected token {self.peek().type}")
+
+            # jump to the block end, which an empty loop never reached
+            self.pos = block_start
+            self.skip_block()
             self.expect('RGROUP')
             
         else:
@@ -296,20 +340,99 @@ class Interpreter:
             self.execute_statement()
             
     def skip_block(self):
-        depth = 1
-        while depth > 0 and self.peek().type != 'EOF':
-            token = self.advance()
-            if token.type == 'LGROUP':
-                depth += 1
-            elif token.type == 'RGROUP':
-                depth -= 1
+        """Jump from just inside a block to its closing RGROUP.
+
+        Uses the index `match_braces` recorded on the opening LGROUP at
+        tokenize time, so skipping costs the same for any block size.
+        """
+        self.pos = self.tokens[self.pos - 1].match
                 
+    def compile(self, tokens):
+        """Run the front end: parse, optimize and resolve the tokens, and
+        compile them to bytecode for the vm engine."""
+        program = Parser(tokens).parse()
+        if self.optimize:
+            program = optimize(program, self.optimize)
+        resolve(program, known_names=self.variables)
+        if self.engine == 'vm':
+            from vm.compiler import compile_program
+            return compile_program(program)
+        if self.engine == 'py':
+            from codegen.codegen import generate
+            return generate(program, known_names=self.variables)
+        return program
+
+    def execute(self, compiled):
+        try:
+            if self.engine == 'vm':
+                from vm.machine import VM
+                return VM(self).run(compiled)
+            if self.engine == 'py':
+                return compiled.run(self)
+            if self.profiler:
+                from .profiler import ProfilingEvaluator
+                return ProfilingEvaluator(self, self.profiler).run(compiled)
+            if self.memory:
+                from .memory import MemoryEvaluator
+                return MemoryEvaluator(self, self.memory).run(compiled)
+            return Evaluator(self).run(compiled)
+        finally:
+            self.output.flush()
+            if self.profiler:
+                self.profiler.report()
+                if self.profile_output:
+                    self.profiler.write_collapsed(self.profile_output)
+            if self.memory_report:
+                self.memory.report()
+
     def interpret(self, tokens):
+        if self.engine == 'tokens':
+            return self.interpret_tokens(tokens)
+        return self.execute(self.compile(tokens))
+
+    def interpret_source(self, code):
+        """Lex, compile and run source text.
+
+        With a cache, a script that was compiled before with the same
+        engine, options and known variables skips the front end entirely.
+        """
+        if self.engine == 'tokens':
+            return self.interpret(Lexer(code).tokenize())
+        return self.execute(self.compile_source(code))
+
+    def compile_source(self, code):
+        """`compile()` for source text, going through the cache if any."""
+        if self.cache is None:
+            return self.compile(Lexer(code).tokenize())
+        key = self.cache.key(code, self.engine, self.optimize, list(self.variables))
+        compiled = self.cache.get(key)
+        if compiled is None:
+            compiled = self.compile(Lexer(code).tokenize())
+            self.cache.put(key, compiled)
+        return compiled
+
+    def start(self, code):
+        """Compile source text into a `ScriptTask` that runs in slices.
+
+        Only the vm engine can suspend a run part way through.
+        """
+        if self.engine != 'vm':
+            raise ValueError("Resumable execution is only supported by the vm engine")
+        from .task import ScriptTask
+        return ScriptTask(self, self.compile_source(code))
+
+    def interpret_tokens(self, tokens):
         self.tokens = tokens
         self.pos = 0
         
-        while self.peek().type != 'EOF':
-            self.execute_statement()
+        try:
+            while self.peek().type != 'EOF':
+                self.execute_statement()
+        except TypeError as e:
+            # operands of the wrong type, reported where evaluation stopped
+            self.error(str(e))
+        finally:
+            self.output.flush()
         
         return self.variables
 
@@ -0,0 +1,252 @@
+"""Approximate memory accounting for the ast engine.
+
+A `MemoryTracker` keeps a running estimate of the bytes held by script
+variables, updated whenever a statement stores a value. A value that
+several variables share is counted once. The estimates follow the value
+representations in `runtime`: NumPy lists count their buffer, ropes
+their length, lazy ranges and views only their own small object.
+"""
+import sys
+
+from lexer.lexer import ScriptError
+from parser.resolver import UNBOUND, load_slots, store_slots
+from runtime import values
+from runtime.strings import Rope
+from runtime.values import LIST_TYPES, Range, ListView, builtin_len, copy_list, type_name
+from .evaluator import UNSET, Evaluator
+from .profiler import STATEMENT_NAMES
+
+# bytes of a NumPy array object without its buffer, and per list item
+ARRAY_HEADER = 112
+ITEM_SIZE = 8
+
+
+def owner(value):
+    """The object whose memory `value` stands for: NumPy lists and their
+    views count the array that owns the buffer, so sharing it is free."""
+    if type(value) is values.NumList:
+        while isinstance(value.base, values.numpy.ndarray):
+            value = value.base
+    return value
+
+
+def list_size(length):
+    """Estimated bytes of a new NumPy list of `length` items."""
+    return ARRAY_HEADER + length * ITEM_SIZE
+
+
+def value_size(value):
+    """Estimated bytes held by `value`, including list items."""
+    kind = type(value)
+    if kind is list:
+        return sys.getsizeof(value) + sum(value_size(item) for item in value)
+    if kind is Rope:
+        return sys.getsizeof(value) + sys.getsizeof(value.parts) + value.length
+    if kind is Range or kind is ListView:
+        return sys.getsizeof(value)
+    if values.numpy is not None and isinstance(value, values.numpy.ndarray):
+        return ARRAY_HEADER + value.nbytes
+    return sys.getsizeof(value)
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+class StatementMemory:
+    __slots__ = ('node', 'stores', 'allocations', 'growth')
+
+    def __init__(self, node):
+        self.node = node
+        # values the statement stored into a variable
+        self.stores = 0
+        # stores of a value no other variable held yet
+        self.allocations = 0
+        # net change of the bytes held by variables
+        self.growth = 0
+
+    @property
+    def label(self):
+        return f"{STATEMENT_NAMES[type(self.node)]} (line {self.node.line})"
+
+
+class MemoryTracker:
+    """Bytes held by script variables: current, peak and per statement.
+
+    With a `limit`, a store that would take the total past it raises
+    ScriptError instead, leaving the variable unchanged.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.current = 0
+        self.peak = 0
+        # id(value) -> [size, number of slots holding it]
+        self.held = {}
+        # slot -> id of the value it holds
+        self.slot_ids = {}
+        self.stats = {}
+
+    def get(self, node):
+        stats = self.stats.get(node)
+        if stats is None:
+            stats = self.stats[node] = StatementMemory(node)
+        return stats
+
+    def load(self, slots):
+        """Start a run from the values already in `slots`."""
+        self.current = 0
+        self.held = {}
+        self.slot_ids = {}
+        for slot, value in enumerate(slots):
+            if value is not UNBOUND:
+                value = owner(value)
+                self.add(slot, value, 0 if id(value) in self.held else value_size(value))
+        self.peak = max(self.peak, self.current)
+
+    def add(self, slot, value, size):
+        entry = self.held.get(id(value))
+        if entry is None:
+            self.held[id(value)] = [size, 1]
+            self.current += size
+        else:
+            entry[1] += 1
+        self.slot_ids[slot] = id(value)
+
+    def release(self, slot):
+        key = self.slot_ids.pop(slot, None)
+        if key is None:
+            return 0
+        entry = self.held[key]
+        entry[1] -= 1
+        if entry[1]:
+            return 0
+        del self.held[key]
+        self.current -= entry[0]
+        return entry[0]
+
+    def store(self, node, slot, value):
+        """Account for `node` storing `value` into `slot`. Call before the
+        store, so a ScriptError leaves the slot as it was."""
+        value = owner(value)
+        key = id(value)
+        old = self.slot_ids.get(slot)
+        if old == key:
+            self.get(node).stores += 1
+            return
+        new = 0 if key in self.held else value_size(value)
+        freed = self.held[old][0] if old is not None and self.held[old][1] == 1 else 0
+        growth = new - freed
+        self.check(node, growth)
+        self.release(slot)
+        self.add(slot, value, new)
+        if self.current > self.peak:
+            self.peak = self.current
+        stats = self.get(node)
+        stats.stores += 1
+        stats.allocations += new > 0
+        stats.growth += growth
+
+    def check(self, node, size):
+        """Raise if `size` more bytes would go past the limit."""
+        if self.limit is not None and self.current + size > self.limit:
+            raise ScriptError(f"Runtime Error at token {node.i}: Memory limit of {format_bytes(self.limit)} exceeded "
+                              f"({format_bytes(self.current + size)} needed)")
+
+    def as_dict(self):
+        return {'current': self.current, 'peak': self.peak, 'limit': self.limit,
+                'allocations': sum(stats.allocations for stats in self.stats.values())}
+
+    def report(self, stream=None, limit=20):
+        """Print the totals and the statements that allocated the most."""
+        stream = stream or sys.stderr
+        limit_text = f", limit {format_bytes(self.limit)}" if self.limit is not None else ""
+        stream.write(f"\nMemory: {format_bytes(self.current)} held, peak {format_bytes(self.peak)}{limit_text}\n")
+        rows = sorted(self.stats.values(), key=lambda s: (s.allocations, s.growth), reverse=True)
+        stream.write(f"{'statement':<22} {'stores':>10} {'allocs':>10} {'net bytes':>12}\n")
+        for stats in rows[:limit]:
+            stream.write(f"{stats.label:<22} {stats.stores:>10} {stats.allocations:>10} {stats.growth:>12}\n")
+        stream.flush()
+
+
+class MemoryEvaluator(Evaluator):
+    """An Evaluator that reports every variable store to a MemoryTracker.
+
+    Expressions that build lists are also checked against the limit
+    before they allocate, as one list literal, `list()` call or operation
+    on large lists can take more than the cap at once.
+    """
+
+    def __init__(self, interpreter, memory):
+        super().__init__(interpreter)
+        self.memory = memory
+
+    def run(self, program):
+        self.slots = load_slots(program.names, self.variables)
+        self.cache = [UNSET] * program.cache_size
+        self.memory.load(self.slots)
+        try:
+            self.exec_block(program.body)
+        finally:
+            store_slots(program.names, self.slots, self.variables)
+        return self.variables
+
+    def exec_let(self, node):
+        value = self.evaluate(node.value)
+        self.memory.store(node, node.slot, value)
+        self.slots[node.slot] = value
+
+    def exec_for_range(self, node):
+        self.clear_hoisted(node)
+        start, end = self.loop_bounds(node)
+        slots = self.slots
+        slot = node.slot
+        body = node.body
+        store = self.memory.store
+        for i in range(start, end):
+            store(node, slot, i)
+            slots[slot] = i
+            self.exec_block(body)
+
+    def exec_for_in(self, node):
+        self.clear_hoisted(node)
+        value = self.evaluate(node.iterable)
+        if type(value) not in LIST_TYPES:
+            self.error(node, f"Expected list, got {type_name(value)}")
+        slots = self.slots
+        slot = node.slot
+        body = node.body
+        store = self.memory.store
+        for item in values.iterate(value):
+            store(node, slot, item)
+            slots[slot] = item
+            self.exec_block(body)
+
+    def eval_list(self, node):
+        self.memory.check(node, list_size(len(node.items)))
+        return super().eval_list(node)
+
+    def eval_call(self, node):
+        if node.name != 'list':
+            return super().eval_call(node)
+        value = self.evaluate(node.args[0])
+        if type(value) in LIST_TYPES:
+            # ranges and views are small until list() builds their items
+            self.memory.check(node, list_size(builtin_len(value)))
+        try:
+            return copy_list(value)
+        except (TypeError, ValueError, OverflowError) as e:
+            self.error(node, f"list(): {e}")
+
+    def eval_binop(self, node):
+        left = self.evaluate(node.left)
+        right = self.evaluate(node.right)
+        if type(left) in LIST_TYPES or type(right) in LIST_TYPES:
+            length = max(builtin_len(left) if type(left) in LIST_TYPES else 0,
+                         builtin_len(right) if type(right) in LIST_TYPES else 0)
+            self.memory.check(node, list_size(length))
+        return self.binop(node, left, right)
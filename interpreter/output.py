@@ -0,0 +1,90 @@
+import os
+import sys
+
+DEFAULT_FLUSH_THRESHOLD = 64 * 1024
+
+class CollectorSink:
+    """Keeps all output in memory; handy for tests and embedding."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+
+class BufferedSink:
+    """Collects output and writes it to a text stream in large chunks.
+
+    Output is flushed once `flush_threshold` characters are pending, and by
+    the interpreter when a run ends or fails. With no `stream`, whatever
+    `sys.stdout` is at flush time is used, so `contextlib.redirect_stdout`
+    around `interpret()` keeps working.
+    """
+
+    def __init__(self, stream=None, flush_threshold=DEFAULT_FLUSH_THRESHOLD):
+        self.stream = stream
+        self.flush_threshold = flush_threshold
+        self.parts = []
+        self.pending = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.pending += len(text)
+        if self.pending >= self.flush_threshold:
+            self.flush()
+
+    def flush(self):
+        if not self.parts:
+            return
+        text = ''.join(self.parts)
+        self.parts = []
+        self.pending = 0
+        self.write_out(text)
+
+    def write_out(self, text):
+        stream = self.stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class FileSink(BufferedSink):
+    """Buffered writer straight to a file descriptor, bypassing sys.stdout.
+
+    `target` is a path, which is created or truncated and closed again by
+    `close()`, or an already open file descriptor, which is left open.
+    """
+
+    def __init__(self, target, flush_threshold=DEFAULT_FLUSH_THRESHOLD, encoding='utf-8'):
+        super().__init__(flush_threshold=flush_threshold)
+        self.encoding = encoding
+        if isinstance(target, int):
+            self.fd = target
+            self.owns_fd = False
+        else:
+            self.fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            self.owns_fd = True
+
+    def write_out(self, text):
+        data = text.encode(self.encoding)
+        while data:
+            written = os.write(self.fd, data)
+            data = data[written:]
+
+    def close(self):
+        self.flush()
+        if self.owns_fd and self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
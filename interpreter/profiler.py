@@ -0,0 +1,124 @@
+import sys
+from time import perf_counter
+
+from parser.nodes import *
+from .evaluator import Evaluator
+
+STATEMENT_NAMES = {
+    Let: 'let',
+    Echo: 'echo',
+    If: 'if',
+    While: 'while',
+    ForRange: 'for',
+    ForIn: 'for',
+}
+
+class StatementStats:
+    __slots__ = ('node', 'count', 'total', 'self_time', 'expression_time')
+
+    def __init__(self, node):
+        self.node = node
+        self.count = 0
+        # time inside the statement, including nested statements
+        self.total = 0.0
+        # the same without the time spent in nested statements
+        self.self_time = 0.0
+        # time evaluating the statement's own expressions
+        self.expression_time = 0.0
+
+    @property
+    def label(self):
+        return f"{STATEMENT_NAMES[type(self.node)]} (line {self.node.line})"
+
+
+class Profiler:
+    """Per-statement execution counts and timings for one or more runs."""
+
+    def __init__(self):
+        self.stats = {}
+        # statement path (tuple of nodes) -> self time, for flame graphs
+        self.stacks = {}
+        self.elapsed = 0.0
+
+    def get(self, node):
+        stats = self.stats.get(node)
+        if stats is None:
+            stats = self.stats[node] = StatementStats(node)
+        return stats
+
+    def report(self, stream=None, limit=20):
+        """Print the hottest statements, sorted by self time."""
+        stream = stream or sys.stderr
+        rows = sorted(self.stats.values(), key=lambda s: s.self_time, reverse=True)
+        stream.write(f"\nProfile: {len(rows)} statements, {self.elapsed * 1000:.2f}ms total\n")
+        stream.write(f"{'statement':<22} {'count':>10} {'total ms':>10} {'self ms':>10} {'expr ms':>10} {'self %':>7}\n")
+        for stats in rows[:limit]:
+            share = stats.self_time / self.elapsed * 100 if self.elapsed else 0.0
+            stream.write(f"{stats.label:<22} {stats.count:>10} {stats.total * 1000:>10.2f} "
+                         f"{stats.self_time * 1000:>10.2f} {stats.expression_time * 1000:>10.2f} {share:>6.1f}%\n")
+        stream.flush()
+
+    def write_collapsed(self, path):
+        """Write self times as collapsed stacks, one `a;b;c count` line per
+        statement path with the count in microseconds, for flamegraph.pl or
+        speedscope."""
+        with open(path, "w") as f:
+            for stack, self_time in self.stacks.items():
+                frames = ';'.join(self.get(node).label for node in stack)
+                f.write(f"{frames} {max(1, round(self_time * 1_000_000))}\n")
+
+
+class ProfilingEvaluator(Evaluator):
+    """An Evaluator that times every statement and its expressions.
+
+    Only used when profiling is on, so the plain Evaluator pays nothing.
+    """
+
+    def __init__(self, interpreter, profiler):
+        super().__init__(interpreter)
+        self.profiler = profiler
+        self.stack = ()
+        # time spent in nested statements of each active statement
+        self.child_times = [0.0]
+        self.in_expression = False
+
+    def run(self, program):
+        start = perf_counter()
+        try:
+            return super().run(program)
+        finally:
+            self.profiler.elapsed += perf_counter() - start
+
+    def exec_block(self, body):
+        statements = self.statements
+        profiler = self.profiler
+        child_times = self.child_times
+        for node in body:
+            parent = self.stack
+            self.stack = stack = parent + (node,)
+            child_times.append(0.0)
+            start = perf_counter()
+            try:
+                statements[type(node)](node)
+            finally:
+                elapsed = perf_counter() - start
+                self_time = elapsed - child_times.pop()
+                child_times[-1] += elapsed
+                self.stack = parent
+
+                stats = profiler.get(node)
+                stats.count += 1
+                stats.total += elapsed
+                stats.self_time += self_time
+                profiler.stacks[stack] = profiler.stacks.get(stack, 0.0) + self_time
+
+    def evaluate(self, node):
+        if self.in_expression or not self.stack:
+            return self.expressions[type(node)](node)
+        self.in_expression = True
+        start = perf_counter()
+        try:
+            return self.expressions[type(node)](node)
+        finally:
+            self.in_expression = False
+            self.profiler.get(self.stack[-1]).expression_time += perf_counter() - start
@@ -0,0 +1,87 @@
+"""Inline caches for the ast engine's operator sites.
+
+Every BinOp and Compare node remembers the operand types it last saw and
+a function specialized for them, in `node.cache` as
+`(left type, right type, function)`. While the types stay the same the
+Evaluator calls that function directly; when they change it builds a new
+one. The specialized functions behave exactly like the generic path,
+including its error messages.
+"""
+from lexer.lexer import ScriptError
+from parser.nodes import BINARY_OPS, COMPARISONS
+from runtime.values import elementwise
+from runtime.strings import STRING_TYPES, concat
+
+
+class SpecializationStats:
+    """Counts inline cache hits, misses and re-specializations.
+
+    A miss is any evaluation that had to build a specialized function;
+    a re-specialization is a miss at a site that was already specialized
+    for other types.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.respecializations = 0
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses, 'respecializations': self.respecializations}
+
+    def __repr__(self):
+        return f'SpecializationStats(hits={self.hits}, misses={self.misses}, respecializations={self.respecializations})'
+
+
+def runtime_error(node, message):
+    raise ScriptError(f"Runtime Error at token {node.i}: {message}")
+
+
+def elementwise_at(node):
+    op = node.op
+
+    def apply(left, right):
+        try:
+            return elementwise(op, left, right)
+        except ZeroDivisionError:
+            runtime_error(node, "Division by zero")
+        except ValueError as e:
+            runtime_error(node, str(e))
+    return apply
+
+
+def divide_at(node):
+    def divide(left, right):
+        if right == 0:
+            runtime_error(node, "Division by zero")
+        return left / right
+    return divide
+
+
+def modulo_at(node):
+    def modulo(left, right):
+        if right == 0:
+            runtime_error(node, "Division by zero")
+        return left % right
+    return modulo
+
+
+def specialize_binop(node, left_type, right_type, list_types):
+    """The function computing `node` for operands of these types, with
+    every check the generic path makes for them already decided."""
+    if left_type in list_types or right_type in list_types:
+        return elementwise_at(node)
+    if node.op == 'ADD' and left_type in STRING_TYPES:
+        return concat
+    if node.op == 'DIV':
+        return divide_at(node)
+    if node.op == 'MOD':
+        return modulo_at(node)
+    return BINARY_OPS[node.op]
+
+
+def specialize_compare(node, left_type, right_type, list_types):
+    op = node.op
+    if op not in ('EQ', 'NEQ') and (left_type in list_types or right_type in list_types):
+        return elementwise_at(node)
+    return COMPARISONS[op]
@@ -0,0 +1,57 @@
+import time
+
+from parser.resolver import load_slots, store_slots
+from vm.machine import VM, Frame
+
+class ScriptTask:
+    """A vm run that advances in slices instead of to completion.
+
+    `step(ticks)` runs until the script ends or `ticks` loop iterations
+    have passed, whichever comes first. Straight-line code between loop
+    back-edges always runs to the next one. Variables are written back to
+    the interpreter, and its output flushed, once the task finishes, fails
+    or is cancelled.
+    """
+
+    def __init__(self, interpreter, code):
+        self.interpreter = interpreter
+        self.vm = VM(interpreter)
+        self.frame = Frame(code, load_slots(code.names, interpreter.variables))
+        self.done = False
+        self.slices = 0
+        # thread CPU time spent inside step()
+        self.cpu_time = 0.0
+
+    @property
+    def ticks(self):
+        return self.frame.ticks
+
+    def step(self, ticks=None):
+        """Run one slice; returns True once the script has finished."""
+        if self.done:
+            return True
+        start = time.thread_time()
+        try:
+            finished = self.vm.resume(self.frame, ticks)
+        except BaseException:
+            self.finish()
+            raise
+        finally:
+            self.cpu_time += time.thread_time() - start
+            self.slices += 1
+        if finished:
+            self.finish()
+        return finished
+
+    def run(self):
+        self.step()
+        return self.interpreter.variables
+
+    def finish(self):
+        """End the task where it stands; also how a task is cancelled."""
+        if self.done:
+            return
+        self.done = True
+        code = self.frame.code
+        store_slots(code.names, self.frame.slots, self.interpreter.variables)
+        self.interpreter.output.flush()
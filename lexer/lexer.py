@@ -4,246 +4,204 @@ class ScriptError(Exception):
     pass
 
 class Token:
-    def __init__(self, type, value, real_type="None", options={}):
+    # Scripts produce millions of tokens, so they carry no per-instance
+    # dict. `type` is always one of the interned names in TOKEN_TYPES.
+    __slots__ = ('type', 'value', 'i', 'offset', 'line', 'match')
+
+    def __init__(self, type, value, i=None, offset=None, line=None):
         self.type = type
         self.value = value
-        self.options = options
-        self.i = None
+        self.i = i
+        # position of the token in the source text, and its 1-based line
+        self.offset = offset
+        self.line = line
+        # for LGROUP tokens, the list index of the matching RGROUP
+        self.match = None
+
+    @property
+    def options(self):
+        if self.type == 'FSTRING':
+            return {"IDENTIFIERS": list(self.value.names)}
+        return {}
+
     def __repr__(self):
         return f'Token({self.type}, {self.value}, {self.i})'
 
+IDENTIFIER_PATTERN = re.compile(r'[^\W\d_][^\W_]*')
+FSTRING_FIELD = re.compile(r'{(.*?)}')
+
+class FStringTemplate:
+    """An f-string split at lex time into literal text and variable names.
+
+    `literals` always has one more entry than `names`; the rendered string
+    interleaves them. The pieces are folded into a single `str.format`
+    pattern so rendering is one call however many placeholders there are.
+    """
+
+    def __init__(self, source):
+        parts = FSTRING_FIELD.split(source)
+        self.source = source
+        self.literals = parts[0::2]
+        self.names = parts[1::2]
+        for name in self.names:
+            if not IDENTIFIER_PATTERN.fullmatch(name):
+                raise ScriptError(f"Invalid f-string placeholder '{{{name}}}'")
+        self.pattern = '{}'.join(
+            literal.replace('{', '{{').replace('}', '}}') for literal in self.literals
+        )
+
+    def render(self, values):
+        """Fill the placeholders with `values`, given in `names` order."""
+        return self.pattern.format(*values)
+
+    def __eq__(self, other):
+        return isinstance(other, FStringTemplate) and other.source == self.source
+
+    def __hash__(self):
+        return hash(self.source)
+
+    def __str__(self):
+        return self.source
+
+    def __repr__(self):
+        return f'FStringTemplate({self.source!r})'
+
+# Words that lex as keywords instead of identifiers. Checked after an
+# identifier matches, so names like `format` or `index` stay identifiers.
+KEYWORDS = {
+    'for': 'FOR',
+    'range': 'RANGE',
+    'in': 'IN',
+    'echo': 'ECHO',
+    'let': 'LET',
+    'if': 'IF',
+    'else': 'ELSE',
+    'while': 'WHILE',
+}
+
+# Order matters: the first alternative that matches wins, so longer
+# operators come before their one-character prefixes.
+TOKEN_SPEC = [
+    ('WHITESPACE', r'\s+'),
+    ('SKIP', r'#[^#]*#'),
+    ('UNCLOSED_SKIP', r'#'),
+    ('FSTRING', r'f"[^"]*"|f\'[^\']*\''),
+    ('UNTERMINATED_FSTRING', r'f["\']'),
+    ('STRING', r'"[^"]*"|\'[^\']*\''),
+    ('UNTERMINATED_STRING', r'["\']'),
+    ('FLOAT', r'\d*\.\d+'),
+    ('NUM', r'\d+'),
+    ('CALCLPAREN', r'calc\('),
+    ('IDENTIFIER', IDENTIFIER_PATTERN.pattern),
+    ('GTE', r'>='),
+    ('LTE', r'<='),
+    ('EQ', r'=='),
+    ('NEQ', r'!='),
+    ('ASSIGN', r'='),
+    ('LSET', r'\['),
+    ('RSET', r'\]'),
+    ('LGROUP', r'\{'),
+    ('RGROUP', r'\}'),
+    ('LANGLE', r'<'),
+    ('RANGLE', r'>'),
+    ('COMMA', r','),
+    ('LPAREN', r'\('),
+    ('RPAREN', r'\)'),
+    ('ADD', r'\+'),
+    ('SUB', r'-'),
+    ('MUL', r'\*'),
+    ('DIV', r'/'),
+    ('MOD', r'%'),
+    ('SEMICOLON', r';'),
+    ('INVALID', r'.'),
+]
+
+MASTER_PATTERN = re.compile(
+    '|'.join(f'(?P<{name}>{pattern})' for name, pattern in TOKEN_SPEC)
+)
+
+# Token type for each group number of MASTER_PATTERN. Indexing this with
+# `match.lastindex` yields the interned names from TOKEN_SPEC, so type
+# checks against string literals are pointer comparisons.
+TOKEN_TYPES = (None,) + tuple(name for name, _ in TOKEN_SPEC)
+
+def match_braces(tokens):
+    """Record on every LGROUP the list index of its matching RGROUP.
+
+    Raises ScriptError for the first unbalanced brace, so a missing `}`
+    is reported before execution instead of running into EOF.
+    """
+    open_groups = []
+    for index, token in enumerate(tokens):
+        if token.type == 'LGROUP':
+            open_groups.append(index)
+        elif token.type == 'RGROUP':
+            if not open_groups:
+                raise ScriptError(f"Unmatched '}}' at token {token.i}")
+            tokens[open_groups.pop()].match = index
+    if open_groups:
+        raise ScriptError(f"Unmatched '{{' at token {tokens[open_groups[-1]].i}")
+    return tokens
+
 class Lexer:
     def __init__(self, code):
         self.code = code
         self.pos = 0
 
-    def get_token(self):
-        if self.pos >= len(self.code):
-            return Token('EOF', None)
-
-        match = re.match(r'\s+', self.code[self.pos:])
-        if match:
-            self.pos += match.end()
-            return self.get_token()
-
-        if self.code[self.pos] == "#":
-            self.pos += 1
-            temp = ""
-            while self.pos < len(self.code):
-                self.pos += 1
-                try:
-                    temp += self.code[self.pos]
-                except:
-                    raise ScriptError(f"unclosed SKIP token!")
-                if self.code[self.pos] == '#':
-                    self.pos += 1
-                    break
-            
-            return Token('SKIP', temp)
-
-        if self.code.startswith('for', self.pos):
-            self.pos += 3
-            return Token('FOR', 'for')
-        
-        if self.code.startswith('range', self.pos):
-            self.pos += 5
-            return Token('RANGE', 'range')
-
-        if self.code.startswith('in', self.pos):
-            self.pos += 3
-            return Token('IN', 'in')
-
-        # add new tokens for groups/lists
-        if self.code[self.pos] == '[':
-            self.pos += 1
-            return Token('LSET', '[')
-
-        if self.code[self.pos] == ']':
-            self.pos += 1
-            return Token('RSET', ']')
-        
-        if self.code[self.pos] == '{':
-            self.pos += 1
-            return Token('LGROUP', '{')
-
-        if self.code[self.pos] == '}':
-            self.pos += 1
-            return Token('RGROUP', '}')
-
-        if self.code[self.pos] == '<':
-            self.pos += 1
-            return Token('LANGLE', '<')
-
-        if self.code[self.pos] == '>':
-            self.pos += 1
-            return Token('RANGLE', '>')
-
-        if self.code[self.pos] == ',':
-            self.pos += 1
-            return Token('COMMA', ',')
-
-        if self.code.startswith('echo', self.pos):
-            self.pos += 4
-            return Token('ECHO', 'echo')
-
-        if self.code.startswith('let', self.pos):
-            self.pos += 3
-            return Token('LET', 'let')
-
-        if self.code.startswith('if', self.pos):
-            self.pos += 2
-            return Token('IF', 'if')
-
-        if self.code.startswith('else', self.pos):
-            self.pos += 4
-            return Token('ELSE', 'else')
-
-        if self.code.startswith('while', self.pos):
-            self.pos += 5
-            return Token('WHILE', 'while')
-
-
-
-        if self.code[self.pos] == '=':
-            if self.code.startswith('==', self.pos):
-                self.pos += 2
-                return Token('EQ', '==')
-            self.pos += 1
-            return Token('ASSIGN', '=')
-
-        if self.code.startswith('>=', self.pos):
-            self.pos += 2
-            return Token('GTE', '>=')
-
-        if self.code.startswith('<=', self.pos):
-            self.pos += 2
-            return Token('LTE', '<=')
-
-        if self.code.startswith('!=', self.pos):
-            self.pos += 2
-            return Token('NEQ', '!=')
-
-        if self.code.startswith('calc(', self.pos):
-            self.pos += 5
-            return Token('CALCLPAREN', 'calc(')
-
-        if self.code[self.pos] == '>':
-            self.pos += 1
-            return Token('GT', '>')
-
-        if self.code[self.pos] == '<':
-            self.pos += 1
-            return Token('LT', '<')
-
-        if self.code[self.pos] == '(':
-            self.pos += 1
-            return Token('LPAREN', '(')
-
-        if self.code[self.pos] == ')':
-            self.pos += 1
-            return Token('RPAREN', ')')
-
-        if self.code[self.pos].isdigit():
-            num = ''
-            while self.pos < len(self.code) and self.code[self.pos].isdigit():
-                num += self.code[self.pos]
-                self.pos += 1
-            return Token('NUM', int(num))
-
-        if self.code[self.pos] == '.':
-            num = ''
-            while self.pos < len(self.code) and (self.code[self.pos].isdigit() or self.code[self.pos] == '.'):
-                num += self.code[self.pos]
-                self.pos += 1
-            return Token('FLOAT', float(num))
-
-
-        if self.code[self.pos] in ('"', "'"):  # Detect string start
-            quote_char = self.code[self.pos]
-            self.pos += 1
-            string_value = ''
-        
-            while self.pos < len(self.code) and self.code[self.pos] != quote_char:
-                string_value += self.code[self.pos]
-                self.pos += 1
-        
-            if self.pos < len(self.code) and self.code[self.pos] == quote_char:
-                self.pos += 1  # Move past the closing quote
-                return Token('STRING', string_value)
-        
-            raise Exception("Unterminated string literal")
-
-        if self.code[self.pos] == 'f' and self.code[self.pos + 1] in ('"', "'"):  # Detect f-string start
-            quote_char = self.code[self.pos + 1]
-            self.pos += 2  # Move past 'f' and opening quote
-            string_value = ''
-            options = {"IDENTIFIERS": []}
-            temp = False
-            identifier = ""
-
-            while self.pos < len(self.code) and self.code[self.pos] != quote_char:
-                if self.code[self.pos] == "{":
-                    temp = True
-                    identifier = ""  # Start collecting the identifier
-                elif self.code[self.pos] == "}":
-                    temp = False
-                    if identifier:
-                        options["IDENTIFIERS"].append(identifier)  # Store complete identifier
-                elif temp:
-                    identifier += self.code[self.pos]  # Collect identifier characters
-                
-                string_value += self.code[self.pos]
-                self.pos += 1
-
-            if self.pos < len(self.code) and self.code[self.pos] == quote_char:
-                self.pos += 1  # Move past the closing quote
-                return Token('FSTRING', string_value, options)
-
-            raise Exception("Unterminated f-string literal")
-
-
-        #TODO: replace isalpha with a different method that allows _
-        if self.code[self.pos].isalpha():  # This handles identifiers
-            name = ''
-            while self.pos < len(self.code) and (self.code[self.pos].isalpha() or self.code[self.pos].isdigit()):
-                name += self.code[self.pos]
-                self.pos += 1
-            return Token('IDENTIFIER', name)
-
-        if self.code[self.pos] == '+':
-            self.pos += 1
-            return Token('ADD', '+')
-
-        if self.code[self.pos] == '-':
-            self.pos += 1
-            return Token('SUB', '-')
-
-        if self.code[self.pos] == '*':
-            self.pos += 1
-            return Token('MUL', '*')
-
-        if self.code[self.pos] == '/':
-            self.pos += 1
-            return Token('DIV', '/')
-
-        if self.code[self.pos] == '%':
-            self.pos += 1
-            return Token('MOD', '%')
-
-        if self.code[self.pos] == ';':
-            self.pos += 1
-            return Token('SEMICOLON', ';')
-
-        raise ScriptError(f'Invalid character: {self.code[self.pos]}')
-
     def tokenize(self):
+        """Tokenize the whole source with the compiled master pattern.
+
+        Each step is a single `MASTER_PATTERN.match(code, pos)`, so the
+        source is never sliced and lexing stays linear in its length.
+        """
+        code = self.code
+        match = MASTER_PATTERN.match
+        keywords = KEYWORDS
+        token_types = TOKEN_TYPES
         tokens = []
+        append = tokens.append
         n = 0
-        while True:
+        pos = 0
+        line = 1
+        end = len(code)
+
+        while pos < end:
+            m = match(code, pos)
+            kind = token_types[m.lastindex]
+            value = m.group()
+            start = pos
+            pos = m.end()
+
+            if kind == 'WHITESPACE':
+                line += value.count('\n')
+                continue
+            elif kind == 'IDENTIFIER':
+                kind = keywords.get(value, kind)
+            elif kind == 'NUM':
+                value = int(value)
+            elif kind == 'FLOAT':
+                value = float(value)
+            elif kind == 'STRING':
+                value = value[1:-1]
+            elif kind == 'FSTRING':
+                value = FStringTemplate(value[2:-1])
+            elif kind == 'SKIP':
+                value = value[1:-1]
+            elif kind == 'UNCLOSED_SKIP':
+                raise ScriptError(f"unclosed SKIP token!")
+            elif kind == 'UNTERMINATED_STRING':
+                raise ScriptError("Unterminated string literal")
+            elif kind == 'UNTERMINATED_FSTRING':
+                raise ScriptError("Unterminated f-string literal")
+            elif kind == 'INVALID':
+                raise ScriptError(f'Invalid character: {value}')
+
             n += 1
-            token = self.get_token()
-            token.i = n
-            tokens.append(token)
-            if token.type == 'EOF':
-                break
-        return tokens
\ No newline at end of file
+            append(Token(kind, value, n, start, line))
+            # strings and comments may span lines
+            if kind in ('STRING', 'FSTRING', 'SKIP'):
+                line += m.group().count('\n')
+
+        append(Token('EOF', None, n + 1, pos, line))
+        self.pos = pos
+        return match_braces(tokens)
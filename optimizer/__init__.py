@@ -0,0 +1 @@
+from .optimizer import *
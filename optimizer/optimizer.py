@@ -0,0 +1,224 @@
+from parser.nodes import *
+
+# -O0 runs the tree as parsed, -O1 folds constants and drops dead branches,
+# -O2 also hoists loop-invariant expressions.
+LEVELS = (0, 1, 2)
+
+LOOPS = (While, ForRange, ForIn)
+
+def optimize(program, level=1):
+    """Rewrite `program` in place for the given optimization level."""
+    if level not in LEVELS:
+        raise ValueError(f"Unknown optimization level {level!r}, expected one of {LEVELS}")
+    if level >= 1:
+        ConstantFolder().fold_program(program)
+    if level >= 2:
+        LoopHoister(program).hoist_block(program.body)
+    return program
+
+
+class ConstantFolder:
+    """Folds constant expressions and removes statically dead branches.
+
+    Anything that would fail at runtime, such as a division by zero or
+    adding a string to a number, is left in place so the error is still
+    raised, with its usual message, when the statement runs.
+    """
+
+    def fold_program(self, program):
+        program.body = self.fold_block(program.body)
+
+    def fold_block(self, body):
+        result = []
+        for node in body:
+            result.extend(self.fold_statement(node))
+        return result
+
+    def fold_statement(self, node):
+        """Return the statements that replace `node`."""
+        if isinstance(node, (Let, Echo)):
+            node.value = self.fold(node.value)
+            return [node]
+
+        if isinstance(node, If):
+            node.condition = self.fold(node.condition)
+            node.body = self.fold_block(node.body)
+            node.orelse = self.fold_block(node.orelse)
+            if isinstance(node.condition, Const):
+                return node.body if node.condition.value else node.orelse
+            return [node]
+
+        if isinstance(node, While):
+            node.condition = self.fold(node.condition)
+            node.body = self.fold_block(node.body)
+            if isinstance(node.condition, Const) and not node.condition.value:
+                return []
+            return [node]
+
+        if isinstance(node, ForRange):
+            node.start = self.fold(node.start)
+            node.end = self.fold(node.end)
+            node.body = self.fold_block(node.body)
+            if (isinstance(node.start, Const) and isinstance(node.end, Const)
+                    and type(node.start.value) == int and type(node.end.value) == int
+                    and node.start.value >= node.end.value):
+                return []
+            return [node]
+
+        if isinstance(node, ForIn):
+            node.iterable = self.fold(node.iterable)
+            node.body = self.fold_block(node.body)
+            return [node]
+
+        return [node]
+
+    def fold(self, node):
+        if isinstance(node, ListLiteral):
+            node.items = [self.fold(item) for item in node.items]
+            return node
+
+        if isinstance(node, Call):
+            node.args = [self.fold(arg) for arg in node.args]
+            return node
+
+        if isinstance(node, FString):
+            if not node.template.names:
+                return Const(node.template.render([]), i=node.i)
+            return node
+
+        if isinstance(node, UnaryOp):
+            node.operand = self.fold(node.operand)
+            if isinstance(node.operand, Const):
+                value = node.operand.value
+                if node.op == 'ADD':
+                    return Const(value, i=node.i)
+                return self.constant(node, lambda: -value)
+            return node
+
+        if isinstance(node, BinOp):
+            node.left = self.fold(node.left)
+            node.right = self.fold(node.right)
+            if isinstance(node.left, Const) and isinstance(node.right, Const):
+                left, right = node.left.value, node.right.value
+                if node.op == 'DIV':
+                    if right == 0:
+                        return node
+                    return self.constant(node, lambda: left / right)
+                return self.constant(node, lambda: BINARY_OPS[node.op](left, right))
+            return node
+
+        if isinstance(node, Compare):
+            node.left = self.fold(node.left)
+            node.right = self.fold(node.right)
+            if isinstance(node.left, Const) and isinstance(node.right, Const):
+                left, right = node.left.value, node.right.value
+                return self.constant(node, lambda: COMPARISONS[node.op](left, right))
+            return node
+
+        return node
+
+    def constant(self, node, compute):
+        try:
+            return Const(compute(), i=node.i)
+        except Exception:
+            return node
+
+
+class LoopHoister:
+    """Wraps loop-invariant expressions in loop bodies in `Hoisted` nodes.
+
+    An expression is invariant when it reads no variable the loop assigns.
+    Expressions have no side effects, so its value is the same on every
+    iteration; the Hoisted node computes it where it is first reached and
+    reuses the result, which keeps errors and output order unchanged when
+    the loop never gets that far.
+    """
+
+    def __init__(self, program):
+        self.program = program
+
+    def hoist_block(self, body):
+        for node in body:
+            if isinstance(node, LOOPS):
+                self.hoist_loop(node)
+            elif isinstance(node, If):
+                self.hoist_block(node.body)
+                self.hoist_block(node.orelse)
+
+    def hoist_loop(self, loop):
+        assigned = set()
+        self.collect_assigned(loop, assigned)
+        if isinstance(loop, While):
+            loop.condition = self.hoist_expression(loop.condition, loop, assigned)
+        self.hoist_statements(loop.body, loop, assigned)
+        # nested loops get their own pass for what varies only in this loop
+        self.hoist_block(loop.body)
+
+    def hoist_statements(self, body, loop, assigned):
+        for node in body:
+            if isinstance(node, (Let, Echo)):
+                node.value = self.hoist_expression(node.value, loop, assigned)
+            elif isinstance(node, If):
+                node.condition = self.hoist_expression(node.condition, loop, assigned)
+                self.hoist_statements(node.body, loop, assigned)
+                self.hoist_statements(node.orelse, loop, assigned)
+            elif isinstance(node, While):
+                node.condition = self.hoist_expression(node.condition, loop, assigned)
+                self.hoist_statements(node.body, loop, assigned)
+            elif isinstance(node, ForRange):
+                node.start = self.hoist_expression(node.start, loop, assigned)
+                node.end = self.hoist_expression(node.end, loop, assigned)
+                self.hoist_statements(node.body, loop, assigned)
+            elif isinstance(node, ForIn):
+                node.iterable = self.hoist_expression(node.iterable, loop, assigned)
+                self.hoist_statements(node.body, loop, assigned)
+
+    def hoist_expression(self, node, loop, assigned):
+        """Return `node` with its largest invariant subexpressions hoisted."""
+        if self.is_invariant(node, assigned):
+            if self.worth_hoisting(node):
+                slot = self.program.cache_size
+                self.program.cache_size += 1
+                loop.hoisted.append(slot)
+                return Hoisted(slot, node, i=node.i)
+            return node
+
+        if isinstance(node, UnaryOp):
+            node.operand = self.hoist_expression(node.operand, loop, assigned)
+        elif isinstance(node, (BinOp, Compare)):
+            node.left = self.hoist_expression(node.left, loop, assigned)
+            node.right = self.hoist_expression(node.right, loop, assigned)
+        elif isinstance(node, ListLiteral):
+            node.items = [self.hoist_expression(item, loop, assigned) for item in node.items]
+        elif isinstance(node, Call):
+            node.args = [self.hoist_expression(arg, loop, assigned) for arg in node.args]
+        return node
+
+    def is_invariant(self, node, assigned):
+        if isinstance(node, Name):
+            return node.name not in assigned
+        if isinstance(node, FString):
+            return not any(name in assigned for name in node.template.names)
+        if isinstance(node, Hoisted):
+            return False
+        if isinstance(node, ListLiteral):
+            # every evaluation must build a fresh list
+            return False
+        return all(self.is_invariant(child, assigned) for child in self.children(node))
+
+    def worth_hoisting(self, node):
+        return isinstance(node, (UnaryOp, BinOp, Compare, FString, Call))
+
+    def children(self, node):
+        for name in node.fields:
+            value = getattr(node, name)
+            if isinstance(value, list):
+                yield from value
+            elif value is not None:
+                yield value
+
+    def collect_assigned(self, node, assigned):
+        if isinstance(node, (Let, ForRange, ForIn)):
+            assigned.add(node.name)
+        for child in self.children(node):
+            self.collect_assigned(child, assigned)
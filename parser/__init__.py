@@ -0,0 +1,3 @@
+from .nodes import *
+from .parser import *
+from .resolver import *
@@ -0,0 +1,233 @@
+import operator
+
+# Python operators behind the BinOp and Compare op names
+BINARY_OPS = {
+    'ADD': operator.add,
+    'SUB': operator.sub,
+    'MUL': operator.mul,
+    'MOD': operator.mod,
+}
+
+COMPARISONS = {
+    'EQ': operator.eq,
+    'NEQ': operator.ne,
+    'GT': operator.gt,
+    'LT': operator.lt,
+    'GTE': operator.ge,
+    'LTE': operator.le,
+    'LANGLE': operator.lt,
+    'RANGLE': operator.gt,
+}
+
+# How scripts spell each op, for generated code and error messages
+SYMBOLS = {
+    'ADD': '+',
+    'SUB': '-',
+    'MUL': '*',
+    'DIV': '/',
+    'MOD': '%',
+    'EQ': '==',
+    'NEQ': '!=',
+    'GT': '>',
+    'LT': '<',
+    'GTE': '>=',
+    'LTE': '<=',
+    'LANGLE': '<',
+    'RANGLE': '>',
+}
+
+# Builtin functions scripts can call, with their (min, max) argument counts.
+# The implementations live in runtime.values.
+FUNCTIONS = {
+    'len': (1, 1),
+    'sum': (1, 1),
+    'min': (1, None),
+    'max': (1, None),
+    'range': (2, 2),
+    'view': (2, 3),
+    'list': (1, 1),
+}
+
+
+class Node:
+    """Base class for AST nodes.
+
+    `fields` names the attributes holding child nodes or lists of them, so
+    passes can walk the tree without knowing every node type. `i` is the
+    index of the token the node was parsed from, used in error messages.
+    Statements also get the source `line` they start on.
+    """
+    fields = ()
+    line = None
+
+    def __init__(self, i=None):
+        self.i = i
+
+    def __repr__(self):
+        args = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__dict__ if name not in ('i', 'line', 'cache'))
+        return f'{type(self).__name__}({args})'
+
+    def __getstate__(self):
+        # inline caches hold functions and are rebuilt on the next run
+        state = self.__dict__.copy()
+        state.pop('cache', None)
+        return state
+
+
+# Statements
+
+class Program(Node):
+    fields = ('body',)
+
+    def __init__(self, body, i=None):
+        super().__init__(i)
+        self.body = body
+        # number of Hoisted cache slots the optimizer allocated
+        self.cache_size = 0
+        # variable name for each slot, filled in by the resolver
+        self.names = []
+
+
+class Let(Node):
+    fields = ('value',)
+
+    def __init__(self, name, value, i=None):
+        super().__init__(i)
+        self.name = name
+        self.value = value
+
+
+class Echo(Node):
+    fields = ('value',)
+
+    def __init__(self, value, i=None):
+        super().__init__(i)
+        self.value = value
+
+
+class If(Node):
+    fields = ('condition', 'body', 'orelse')
+
+    def __init__(self, condition, body, orelse=None, i=None):
+        super().__init__(i)
+        self.condition = condition
+        self.body = body
+        self.orelse = orelse if orelse is not None else []
+
+
+class While(Node):
+    fields = ('condition', 'body')
+
+    def __init__(self, condition, body, i=None):
+        super().__init__(i)
+        self.condition = condition
+        self.body = body
+        # Hoisted cache slots to clear each time the loop starts
+        self.hoisted = []
+
+
+class ForRange(Node):
+    fields = ('start', 'end', 'body')
+
+    def __init__(self, name, start, end, body, i=None):
+        super().__init__(i)
+        self.name = name
+        self.start = start
+        self.end = end
+        self.body = body
+        self.hoisted = []
+
+
+class ForIn(Node):
+    fields = ('iterable', 'body')
+
+    def __init__(self, name, iterable, body, i=None):
+        super().__init__(i)
+        self.name = name
+        self.iterable = iterable
+        self.body = body
+        self.hoisted = []
+
+
+# Expressions
+
+class Const(Node):
+    def __init__(self, value, i=None):
+        super().__init__(i)
+        self.value = value
+
+
+class FString(Node):
+    def __init__(self, template, i=None):
+        super().__init__(i)
+        self.template = template
+
+
+class Name(Node):
+    def __init__(self, name, i=None):
+        super().__init__(i)
+        self.name = name
+
+
+class ListLiteral(Node):
+    fields = ('items',)
+
+    def __init__(self, items, i=None):
+        super().__init__(i)
+        self.items = items
+
+
+class UnaryOp(Node):
+    fields = ('operand',)
+
+    def __init__(self, op, operand, i=None):
+        super().__init__(i)
+        self.op = op
+        self.operand = operand
+
+
+class BinOp(Node):
+    fields = ('left', 'right')
+    # (left type, right type, function) once the ast engine has run it
+    cache = None
+
+    def __init__(self, op, left, right, i=None):
+        super().__init__(i)
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Compare(Node):
+    fields = ('left', 'right')
+    # (left type, right type, function) once the ast engine has run it
+    cache = None
+
+    def __init__(self, op, left, right, i=None):
+        super().__init__(i)
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Call(Node):
+    fields = ('args',)
+
+    def __init__(self, name, args, i=None):
+        super().__init__(i)
+        self.name = name
+        self.args = args
+
+
+class Hoisted(Node):
+    """A loop-invariant expression, computed once per loop run.
+
+    The first evaluation stores the value in cache slot `slot`; later
+    evaluations reuse it until the owning loop clears the slot on entry.
+    """
+    fields = ('value',)
+
+    def __init__(self, slot, value, i=None):
+        super().__init__(i)
+        self.slot = slot
+        self.value = value
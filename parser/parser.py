@@ -0,0 +1,207 @@
+from lexer.lexer import ScriptError, Token
+from .nodes import *
+
+COMPARISON_OPS = ('EQ', 'NEQ', 'GT', 'LT', 'GTE', 'LTE', 'LANGLE', 'RANGLE')
+
+class Parser:
+    """Builds an AST from the token list produced by `Lexer.tokenize()`."""
+
+    def __init__(self, tokens):
+        # comments carry no meaning for execution
+        self.tokens = [token for token in tokens if token.type != 'SKIP']
+        self.pos = 0
+
+    def error(self, message):
+        token = self.peek()
+        raise ScriptError(f"Syntax Error at token {token.i}: {message}")
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return Token('EOF', None)
+
+    def advance(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, type):
+        token = self.peek()
+        if token.type != type:
+            self.error(f"Expected {type}, got {token.type}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        body = []
+        while self.peek().type != 'EOF':
+            body.append(self.parse_located_statement())
+        return Program(body, i=1)
+
+    # Statements
+
+    def parse_located_statement(self):
+        line = self.peek().line
+        node = self.parse_statement()
+        node.line = line
+        return node
+
+    def parse_statement(self):
+        token = self.peek()
+
+        if token.type == 'LET':
+            self.advance()
+            name = self.expect('IDENTIFIER').value
+            self.expect('ASSIGN')
+            value = self.parse_expression()
+            self.expect('SEMICOLON')
+            return Let(name, value, i=token.i)
+
+        elif token.type == 'ECHO':
+            self.advance()
+            value = self.parse_expression()
+            self.expect('SEMICOLON')
+            return Echo(value, i=token.i)
+
+        elif token.type == 'IF':
+            self.advance()
+            condition = self.parse_expression()
+            body = self.parse_block()
+            orelse = []
+            if self.peek().type == 'ELSE':
+                self.advance()
+                orelse = self.parse_block()
+            return If(condition, body, orelse, i=token.i)
+
+        elif token.type == 'WHILE':
+            self.advance()
+            condition = self.parse_expression()
+            body = self.parse_block()
+            return While(condition, body, i=token.i)
+
+        elif token.type == 'FOR':
+            self.advance()
+            name = self.expect('IDENTIFIER').value
+            self.expect('IN')
+            if self.peek().type == 'RANGE':
+                self.advance()
+                self.expect('LPAREN')
+                start = self.parse_expression()
+                self.expect('COMMA')
+                end = self.parse_expression()
+                self.expect('RPAREN')
+                body = self.parse_block()
+                return ForRange(name, start, end, body, i=token.i)
+
+            iterable = self.parse_expression()
+            body = self.parse_block()
+            return ForIn(name, iterable, body, i=token.i)
+
+        self.error(f"Unexpected token {token.type}")
+
+    def parse_block(self):
+        self.expect('LGROUP')
+        body = []
+        while self.peek().type not in ('RGROUP', 'EOF'):
+            body.append(self.parse_located_statement())
+        self.expect('RGROUP')
+        return body
+
+    # Expressions
+
+    def parse_expression(self):
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_term()
+        token = self.peek()
+        if token.type in COMPARISON_OPS:
+            self.advance()
+            right = self.parse_term()
+            return Compare(token.type, left, right, i=token.i)
+        return left
+
+    def parse_term(self):
+        left = self.parse_factor()
+        while self.peek().type in ('ADD', 'SUB'):
+            op = self.advance()
+            right = self.parse_factor()
+            left = BinOp(op.type, left, right, i=op.i)
+        return left
+
+    def parse_factor(self):
+        left = self.parse_primary()
+        while self.peek().type in ('MUL', 'DIV', 'MOD'):
+            op = self.advance()
+            right = self.parse_primary()
+            left = BinOp(op.type, left, right, i=op.i)
+        return left
+
+    def parse_primary(self):
+        token = self.peek()
+
+        if token.type in ('NUM', 'FLOAT', 'STRING'):
+            self.advance()
+            return Const(token.value, i=token.i)
+
+        elif token.type == 'FSTRING':
+            self.advance()
+            return FString(token.value, i=token.i)
+
+        elif token.type == 'IDENTIFIER':
+            self.advance()
+            if self.peek().type == 'LPAREN':
+                return self.parse_call(token)
+            return Name(token.value, i=token.i)
+
+        elif token.type == 'RANGE':
+            self.advance()
+            return self.parse_call(token)
+
+        elif token.type in ('LPAREN', 'CALCLPAREN'):
+            self.advance()
+            value = self.parse_expression()
+            self.expect('RPAREN')
+            return value
+
+        elif token.type in ('ADD', 'SUB'):
+            self.advance()
+            return UnaryOp(token.type, self.parse_primary(), i=token.i)
+
+        elif token.type == 'LSET':
+            return self.parse_list()
+
+        self.error(f"Unexpected token {token.type}")
+
+    def parse_call(self, name):
+        function = name.value
+        if function not in FUNCTIONS:
+            self.pos -= 1
+            self.error(f"Unknown function '{function}'")
+        self.expect('LPAREN')
+        args = []
+        if self.peek().type != 'RPAREN':
+            args.append(self.parse_expression())
+            while self.peek().type == 'COMMA':
+                self.advance()
+                args.append(self.parse_expression())
+        self.expect('RPAREN')
+
+        low, high = FUNCTIONS[function]
+        if len(args) < low or (high is not None and len(args) > high):
+            expected = str(low) if low == high else f"at least {low}"
+            raise ScriptError(f"Syntax Error at token {name.i}: {function}() takes {expected} argument(s), got {len(args)}")
+        return Call(function, args, i=name.i)
+
+    def parse_list(self):
+        start = self.expect('LSET')
+        items = []
+        while True:
+            # commas between items are optional, as in the token engine
+            while self.peek().type == 'COMMA':
+                self.advance()
+            if self.peek().type in ('RSET', 'EOF'):
+                break
+            items.append(self.parse_expression())
+        self.expect('RSET')
+        return ListLiteral(items, i=start.i)
@@ -0,0 +1,79 @@
+from lexer.lexer import ScriptError
+from .nodes import *
+
+# value held by the slot of a variable that has not been assigned yet
+UNBOUND = object()
+
+class Resolver:
+    """Assigns every variable a fixed slot index before execution.
+
+    Sets `slot` on Name, Let, ForRange and ForIn nodes and `slots` on
+    FString nodes, and records the slot names on the program as
+    `program.names`. Engines then keep values in a list indexed by slot
+    instead of a dict keyed by name.
+
+    A variable that is read but never assigned anywhere in the program (and
+    is not in `known_names`) can only fail, so it is reported here, before
+    anything runs. Reads that may still come before the assignment at
+    runtime are left to the engine.
+    """
+
+    def __init__(self, known_names=()):
+        self.index = {}
+        self.names = []
+        self.assigned = set()
+        self.reads = []
+        for name in known_names:
+            self.slot(name)
+            self.assigned.add(name)
+
+    def slot(self, name):
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+        return self.index[name]
+
+    def resolve(self, program):
+        self.visit(program)
+        for node, name, message in self.reads:
+            if name not in self.assigned:
+                raise ScriptError(f"Syntax Error at token {node.i}: {message}")
+        program.names = self.names
+        return program
+
+    def visit(self, node):
+        if isinstance(node, (Let, ForRange, ForIn)):
+            node.slot = self.slot(node.name)
+            self.assigned.add(node.name)
+        elif isinstance(node, Name):
+            node.slot = self.slot(node.name)
+            self.reads.append((node, node.name, f"Undefined variable '{node.name}'"))
+        elif isinstance(node, FString):
+            node.slots = [self.slot(name) for name in node.template.names]
+            for name in node.template.names:
+                self.reads.append((node, name, f"Undefined variable '{name}' in f-string"))
+
+        for name in node.fields:
+            value = getattr(node, name)
+            if isinstance(value, list):
+                for child in value:
+                    self.visit(child)
+            elif value is not None:
+                self.visit(value)
+
+
+def resolve(program, known_names=()):
+    return Resolver(known_names).resolve(program)
+
+
+def load_slots(names, variables):
+    """Build the slot list for `names` from a name->value mapping."""
+    return [variables.get(name, UNBOUND) for name in names]
+
+
+def store_slots(names, slots, variables):
+    """Copy assigned slots back into a name->value mapping."""
+    for name, value in zip(names, slots):
+        if value is not UNBOUND:
+            variables[name] = value
+    return variables
@@ -2,21 +2,37 @@ import sys
 import os
 import traceback
 import time
-import io
-import contextlib
-from lexer import Lexer
-from interpreter import Interpreter
-
-# Terminal color codes
-RESET = "\033[0m"
-GREEN = "\033[92m"
-RED = "\033[91m"
-YELLOW = "\033[93m"
-CYAN = "\033[96m"
+import hashlib
+import json
+import re
+import multiprocessing
+from multiprocessing.connection import wait
+from xml.etree import ElementTree
+from lexer import Lexer, ScriptError
+from interpreter import Interpreter, CollectorSink, ENGINES
+
+# Terminal color codes, left out when stdout is not a terminal
+if sys.stdout.isatty():
+    RESET = "\033[0m"
+    GREEN = "\033[92m"
+    RED = "\033[91m"
+    YELLOW = "\033[93m"
+    CYAN = "\033[96m"
+else:
+    RESET = GREEN = RED = YELLOW = CYAN = ""
 
 # Path to store the last used test number
 TEST_FILE = "last_test.txt"
 TESTS_FOLDER = "tests"
+# Content hashes of the tests that passed on the last suite run
+CACHE_FILE = ".test_cache.json"
+# Packages whose sources decide every test's outcome
+SOURCE_PACKAGES = ("lexer", "parser", "optimizer", "vm", "codegen", "interpreter", "cache", "runtime")
+# Tests of features an engine does not implement; the tokens engine has
+# no list operators or builtin calls, and reports errors at other tokens
+UNSUPPORTED_TESTS = {
+    "tokens": ("test11_list_arithmetic", "test12_range_views", "test13_large_ints", "test14_modulo"),
+}
 
 def save_test_number(number):
     """Save the test number to a file."""
@@ -39,7 +55,7 @@ def find_test_folder(test_number):
     
     return os.path.join(TESTS_FOLDER, test_folders[0])  # Return the first match
 
-def run_test(test_number):
+def run_test(test_number, optimize=0):
     """Run the test script and compare output with expected result."""
     test_folder = find_test_folder(test_number)
 
@@ -70,13 +86,9 @@ def run_test(test_number):
         lexer = Lexer(code)
         tokens = lexer.tokenize()
 
-        # Set up to capture the output of the interpreter
-        output_capture = io.StringIO()
-        with contextlib.redirect_stdout(output_capture):
-            interpreter = Interpreter()
-            interpreter.interpret(tokens)
-
-        output = output_capture.getvalue()
+        # Collect the output of the interpreter in memory
+        interpreter = Interpreter(optimize=optimize, output=CollectorSink())
+        output = run_script(interpreter, tokens)
 
         # Read the expected result
         with open(result_file, "r") as f:
@@ -100,15 +112,265 @@ def run_test(test_number):
         print(f"\n{RED}❌ ERROR: Test execution failed!{RESET}")
         print(traceback.format_exc())
 
+def discover_tests():
+    """Return every test folder under TESTS_FOLDER that has a code.at."""
+    folders = []
+    for name in os.listdir(TESTS_FOLDER):
+        folder = os.path.join(TESTS_FOLDER, name)
+        if os.path.isfile(os.path.join(folder, "code.at")):
+            folders.append(folder)
+    # test2 before test10
+    return sorted(folders, key=lambda f: [int(p) if p.isdigit() else p for p in re.split(r"(\d+)", os.path.basename(f))])
+
+def hash_sources():
+    """Hash the interpreter's own sources, so editing them reruns everything."""
+    digest = hashlib.sha256()
+    for package in SOURCE_PACKAGES:
+        for name in sorted(os.listdir(package)):
+            if name.endswith(".py"):
+                with open(os.path.join(package, name), "rb") as f:
+                    digest.update(name.encode() + f.read())
+    return digest.hexdigest()
+
+def hash_test(folder, sources_hash, options):
+    digest = hashlib.sha256(sources_hash.encode() + repr(options).encode())
+    for name in ("code.at", "result.txt"):
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(name.encode() + f.read())
+    return digest.hexdigest()
+
+def load_cache():
+    try:
+        with open(CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache):
+    with open(CACHE_FILE, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+def run_script(interpreter, tokens):
+    """Run a test script and return its output. A script that stops on a
+    ScriptError gets the message as its last line, so result.txt can
+    expect one."""
+    try:
+        interpreter.interpret(tokens)
+    except ScriptError as e:
+        interpreter.output.write(f"{e}\n")
+    return interpreter.output.getvalue()
+
+def execute_test(folder, engine, optimize):
+    """Run one test folder and return its result as a plain dict."""
+    result = {"name": os.path.basename(folder), "folder": folder, "output": "", "expected": "", "error": None}
+    start_time = time.perf_counter()
+    try:
+        with open(os.path.join(folder, "code.at"), "r") as f:
+            code = f.read()
+        with open(os.path.join(folder, "result.txt"), "r") as f:
+            result["expected"] = f.read()
+
+        interpreter = Interpreter(engine=engine, optimize=optimize, cache=False, output=CollectorSink())
+        result["output"] = run_script(interpreter, Lexer(code).tokenize())
+        result["status"] = "passed" if result["output"] == result["expected"] else "failed"
+    except Exception:
+        result["status"] = "error"
+        result["error"] = traceback.format_exc()
+    result["time"] = time.perf_counter() - start_time
+    return result
+
+def _worker_loop(conn, engine, optimize):
+    """Body of a pool worker: run the test folders sent over `conn`."""
+    while True:
+        folder = conn.recv()
+        if folder is None:
+            break
+        conn.send(execute_test(folder, engine, optimize))
+
+class TestWorker:
+    """A pool process that runs one test at a time and can be killed."""
+
+    def __init__(self, engine, optimize):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_worker_loop, args=(child_conn, engine, optimize), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.folder = None
+        self.started = None
+
+    def submit(self, folder):
+        self.folder = folder
+        self.started = time.perf_counter()
+        self.conn.send(folder)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+def run_parallel(folders, jobs, timeout, engine, optimize):
+    """Run test folders across `jobs` worker processes.
+
+    A test that runs longer than `timeout` seconds has its worker killed
+    and replaced, and is reported as a timeout.
+    """
+    pending = list(folders)
+    results = []
+    workers = [TestWorker(engine, optimize) for _ in range(min(jobs, len(pending)))]
+    try:
+        while pending or any(w.folder for w in workers):
+            for worker in workers:
+                if worker.folder is None and pending:
+                    worker.submit(pending.pop(0))
+
+            busy = [w for w in workers if w.folder]
+            now = time.perf_counter()
+            wait_for = max(0.0, min(w.started + timeout - now for w in busy))
+            ready = wait([w.conn for w in busy], wait_for)
+
+            for worker in busy:
+                if worker.conn in ready:
+                    try:
+                        results.append(worker.conn.recv())
+                    except EOFError:
+                        results.append({"name": os.path.basename(worker.folder), "folder": worker.folder, "status": "error",
+                                        "error": "worker process died", "output": "", "expected": "",
+                                        "time": time.perf_counter() - worker.started})
+                        workers[workers.index(worker)] = TestWorker(engine, optimize)
+                        continue
+                    worker.folder = None
+                elif time.perf_counter() - worker.started >= timeout:
+                    results.append({"name": os.path.basename(worker.folder), "folder": worker.folder, "status": "timeout",
+                                    "error": f"timed out after {timeout:.1f} seconds", "output": "", "expected": "",
+                                    "time": time.perf_counter() - worker.started})
+                    worker.kill()
+                    workers[workers.index(worker)] = TestWorker(engine, optimize)
+    finally:
+        for worker in workers:
+            worker.stop()
+    return results
+
+def write_junit(results, skipped, unsupported, path, elapsed):
+    suite = ElementTree.Element("testsuite", name="AhovaTheory", tests=str(len(results) + len(skipped) + len(unsupported)),
+                                failures=str(sum(r["status"] == "failed" for r in results)),
+                                errors=str(sum(r["status"] in ("error", "timeout") for r in results)),
+                                skipped=str(len(skipped) + len(unsupported)), time=f"{elapsed:.3f}")
+    for result in results:
+        case = ElementTree.SubElement(suite, "testcase", classname="tests", name=result["name"], time=f"{result['time']:.3f}")
+        if result["status"] == "failed":
+            failure = ElementTree.SubElement(case, "failure", message="output differs from result.txt")
+            failure.text = f"Expected:\n{result['expected']}\nActual:\n{result['output']}"
+        elif result["status"] in ("error", "timeout"):
+            error = ElementTree.SubElement(case, "error", message=result["status"])
+            error.text = result["error"]
+        if result["output"]:
+            ElementTree.SubElement(case, "system-out").text = result["output"]
+    for folders, message in ((skipped, "unchanged since last green run"), (unsupported, "not supported by the engine")):
+        for folder in folders:
+            case = ElementTree.SubElement(suite, "testcase", classname="tests", name=os.path.basename(folder), time="0")
+            ElementTree.SubElement(case, "skipped", message=message)
+    ElementTree.ElementTree(suite).write(path, encoding="utf-8", xml_declaration=True)
+
+def run_suite(jobs=None, timeout=10.0, junit=None, force=False, engine="ast", optimize=0):
+    """Run every test in TESTS_FOLDER in parallel and report the results.
+
+    Tests whose code.at, result.txt and interpreter sources are unchanged
+    since they last passed are skipped unless `force` is set, as are tests
+    listed in UNSUPPORTED_TESTS for the engine. Returns True when nothing
+    failed.
+    """
+    start_time = time.perf_counter()
+    folders = discover_tests()
+    unsupported = [f for f in folders if os.path.basename(f) in UNSUPPORTED_TESTS.get(engine, ())]
+    folders = [f for f in folders if f not in unsupported]
+    sources_hash = hash_sources()
+    options = (engine, optimize)
+    hashes = {folder: hash_test(folder, sources_hash, options) for folder in folders}
+    cache = {} if force else load_cache()
+
+    skipped = [f for f in folders if cache.get(f) == hashes[f]]
+    to_run = [f for f in folders if f not in skipped]
+    results = run_parallel(to_run, jobs or os.cpu_count() or 1, timeout, engine, optimize) if to_run else []
+    results.sort(key=lambda r: to_run.index(r["folder"]))
+    elapsed = time.perf_counter() - start_time
+
+    for result in results:
+        if result["status"] == "passed":
+            print(f"{GREEN}✅ {result['name']} passed in {result['time']:.3f} seconds.{RESET}")
+        else:
+            print(f"{RED}❌ {result['name']} {result['status']} in {result['time']:.3f} seconds.{RESET}")
+            if result["status"] == "failed":
+                print(f"{YELLOW}Expected Output:{RESET}\n{result['expected']}")
+                print(f"{YELLOW}Actual Output:{RESET}\n{result['output']}")
+            else:
+                print(result["error"])
+    for folder in skipped:
+        print(f"{CYAN}⏭️ {os.path.basename(folder)} skipped (unchanged since last green run).{RESET}")
+    for folder in unsupported:
+        print(f"{CYAN}⏭️ {os.path.basename(folder)} skipped (not supported by the {engine} engine).{RESET}")
+
+    passed = sum(r["status"] == "passed" for r in results)
+    failed = len(results) - passed
+    color = GREEN if not failed else RED
+    print(f"\n{color}{passed} passed, {failed} failed, {len(skipped) + len(unsupported)} skipped in {elapsed:.3f} seconds.{RESET}")
+
+    for result in results:
+        if result["status"] == "passed":
+            cache[result["folder"]] = hashes[result["folder"]]
+        else:
+            cache.pop(result["folder"], None)
+    save_cache({f: h for f, h in cache.items() if f in hashes})
+
+    if junit:
+        write_junit(results, skipped, unsupported, junit, elapsed)
+    return not failed
+
+def parse_optimize_flag(args):
+    """Strip a `-O0`/`-O1`/`-O2` flag from args and return the level."""
+    level = 0
+    for arg in list(args):
+        if arg.startswith("-O"):
+            level = int(arg[2:] or 1)
+            args.remove(arg)
+    return level
+
+def parse_suite_args(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog="run_tests.py --all", description="Run every test in the tests/ folder.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds before a test is killed")
+    parser.add_argument("--junit", metavar="PATH", help="also write a JUnit XML report")
+    parser.add_argument("--force", action="store_true", help="rerun tests unchanged since the last green run")
+    parser.add_argument("--engine", default="ast", choices=ENGINES)
+    return parser.parse_args(args)
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    args = sys.argv[1:]
+    optimize = parse_optimize_flag(args)
+    if "--all" in args:
+        args.remove("--all")
+        options = parse_suite_args(args)
+        ok = run_suite(options.jobs, options.timeout, options.junit, options.force, options.engine, optimize)
+        sys.exit(0 if ok else 1)
+    elif args:
         # Save test number if provided
-        save_test_number(sys.argv[1])
-        print(f"\n{GREEN}✅ Test {sys.argv[1]} set as default.{RESET}")
+        save_test_number(args[0])
+        print(f"\n{GREEN}✅ Test {args[0]} set as default.{RESET}")
     else:
         # Load and run last saved test
         last_test = load_test_number()
         if last_test:
-            run_test(last_test)
+            run_test(last_test, optimize)
         else:
             print(f"\n{YELLOW}⚠️ No test number set. Use `py test.py <number>` first.{RESET}")
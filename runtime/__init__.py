@@ -0,0 +1,2 @@
+from .values import *
+from .strings import *
@@ -0,0 +1,112 @@
+"""String values built by concatenation.
+
+`let s = s + "...";` in a loop would copy the whole string on every
+iteration, since the variable slot keeps the old string alive. Once a
+concatenation result reaches `ROPE_THRESHOLD` characters it becomes a
+`Rope` instead, which appends in amortized constant time and joins its
+pieces only when the text is read: printed, compared, interpolated or
+used in any other string operation.
+"""
+
+# below this many characters plain concatenation is cheaper than a Rope
+ROPE_THRESHOLD = 256
+
+
+class Rope:
+    """An immutable string kept as a list of pieces until it is read.
+
+    Ropes made by appending to the same rope share one pieces list: each
+    rope covers its first `count` items. Appending to a rope that is the
+    newest user of the list extends it in place; appending to an older one
+    copies the prefix it covers first. The joined text is cached.
+    """
+
+    __slots__ = ('parts', 'count', 'length', 'flat')
+
+    def __init__(self, parts, length):
+        self.parts = parts
+        self.count = len(parts)
+        self.length = length
+        self.flat = None
+
+    def append(self, text):
+        parts = self.parts
+        if len(parts) != self.count:
+            parts = parts[:self.count]
+        parts.append(text)
+        return Rope(parts, self.length + len(text))
+
+    def __str__(self):
+        flat = self.flat
+        if flat is None:
+            parts = self.parts
+            flat = self.flat = ''.join(parts if len(parts) == self.count else parts[:self.count])
+        return flat
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __format__(self, spec):
+        return format(str(self), spec)
+
+    def __len__(self):
+        return self.length
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __reduce__(self):
+        # pickled flat: the pieces list may be shared and longer than count
+        return (str, (str(self),))
+
+    def __add__(self, other):
+        return concat(self, other)
+
+    def __radd__(self, other):
+        if type(other) is str:
+            return concat(other, self)
+        return other + str(self)
+
+    def __mul__(self, other):
+        return str(self) * other
+
+    __rmul__ = __mul__
+
+    def __mod__(self, other):
+        return str(self) % other
+
+    def __eq__(self, other):
+        return str(self) == (str(other) if type(other) is Rope else other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __lt__(self, other):
+        return str(self) < (str(other) if type(other) is Rope else other)
+
+    def __le__(self, other):
+        return str(self) <= (str(other) if type(other) is Rope else other)
+
+    def __gt__(self, other):
+        return str(self) > (str(other) if type(other) is Rope else other)
+
+    def __ge__(self, other):
+        return str(self) >= (str(other) if type(other) is Rope else other)
+
+
+STRING_TYPES = frozenset((str, Rope))
+
+
+def concat(left, right):
+    """`left + right` for a str or Rope `left`."""
+    if type(right) is Rope:
+        right = str(right)
+    elif type(right) is not str:
+        # raises the same TypeError as adding to a plain string
+        return str(left) + right
+    if type(left) is Rope:
+        return left.append(right)
+    length = len(left) + len(right)
+    if length < ROPE_THRESHOLD:
+        return left + right
+    return Rope([left, right], length)
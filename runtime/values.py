@@ -0,0 +1,427 @@
+"""Runtime value helpers shared by the ast and vm engines.
+
+Lists of at least NUMPY_MIN_LENGTH items holding only ints or only
+floats are stored as NumPy arrays when NumPy is installed, so whole-list
+arithmetic, comparisons and reductions run as single vectorized
+operations. Every other list is a plain Python list with the same
+semantics, computed element by element. Ints stay exact: an operation
+whose result would not fit in 64 bits runs on Python ints instead.
+"""
+import operator
+from itertools import islice
+
+from .strings import STRING_TYPES
+
+# NumPy is imported the first time a list is built rather than with this
+# module, so scripts that never build one do not pay for it at startup
+numpy = None
+NumList = None
+_numpy_loaded = False
+
+# Shorter lists are faster as Python lists, and scripts that only build
+# short ones never pay for importing NumPy
+NUMPY_MIN_LENGTH = 256
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+ELEMENTWISE_OPS = {
+    'ADD': operator.add,
+    'SUB': operator.sub,
+    'MUL': operator.mul,
+    'DIV': operator.truediv,
+    'MOD': operator.mod,
+    'GT': operator.gt,
+    'LT': operator.lt,
+    'GTE': operator.ge,
+    'LTE': operator.le,
+    'LANGLE': operator.lt,
+    'RANGLE': operator.gt,
+}
+
+class LazySequence:
+    """Base for list values that read another sequence instead of holding
+    their own items. They compare equal to any list with the same items."""
+
+    __slots__ = ()
+    __hash__ = None
+
+    def __eq__(self, other):
+        if type(other) not in LIST_TYPES:
+            return False
+        if len(self) != len(other):
+            return False
+        return all(a == b for a, b in zip(self, iterate(other)))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __format__(self, spec):
+        return format(str(self), spec)
+
+
+class Range(LazySequence):
+    """The ints from `start` up to `stop`, computed on demand.
+
+    Length, bounds, sums and sub-ranges take constant time and memory; only
+    `list()` or arithmetic builds the items.
+    """
+
+    __slots__ = ('start', 'stop')
+
+    def __init__(self, start, stop):
+        self.start = start
+        self.stop = max(start, stop)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        return iter(range(self.start, self.stop))
+
+    def __str__(self):
+        return f"range({self.start}, {self.stop})"
+
+    __repr__ = __str__
+
+
+class ListView(LazySequence):
+    """A zero-copy window `[start, stop)` over a Python list."""
+
+    __slots__ = ('base', 'start', 'stop')
+
+    def __init__(self, base, start, stop):
+        self.base = base
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        return islice(self.base, self.start, self.stop)
+
+    def __str__(self):
+        return "[" + ", ".join(repr(item) for item in self) + "]"
+
+    __repr__ = __str__
+
+
+# list value types; NumList joins once NumPy is loaded
+LIST_TYPES = {list, Range, ListView}
+# the ones materialized before arithmetic
+LAZY_TYPES = (Range, ListView)
+
+
+def define_numlist(numpy):
+    class NumList(numpy.ndarray):
+        """A numeric list backed by a one-dimensional NumPy array.
+
+        Prints, tests true and compares equal like the Python list it
+        stands for; arithmetic and ordering comparisons are elementwise.
+        """
+
+        def __str__(self):
+            return str(self.tolist())
+
+        __repr__ = __str__
+
+        def __format__(self, spec):
+            return format(str(self), spec)
+
+        def __bool__(self):
+            return self.size > 0
+
+        def __eq__(self, other):
+            if isinstance(other, numpy.ndarray):
+                other = other.tolist()
+            return self.tolist() == other
+
+        def __ne__(self, other):
+            return not self == other
+
+        __hash__ = None
+
+        def __reduce__(self):
+            # the class only exists once NumPy is loaded, so pickles refer
+            # to a module-level function instead of to it
+            return (array_list, (self.view(numpy.ndarray),))
+
+    return NumList
+
+
+def load_numpy():
+    """Import NumPy on first use; returns whether it is available."""
+    global numpy, NumList, _numpy_loaded
+    if not _numpy_loaded:
+        _numpy_loaded = True
+        try:
+            import numpy
+        except ImportError:
+            return False
+        NumList = define_numlist(numpy)
+        LIST_TYPES.add(NumList)
+    return numpy is not None
+
+
+def array_list(array):
+    """The list value for a plain NumPy array, for unpickling."""
+    load_numpy()
+    return array.view(NumList)
+
+
+def type_name(value):
+    """A value's type as scripts see it: every list representation is a
+    list and every string representation a str."""
+    kind = type(value)
+    if kind in LIST_TYPES:
+        return 'list'
+    if kind in STRING_TYPES:
+        return 'str'
+    return kind.__name__
+
+
+def operand_error(symbol, *operands):
+    """The message for an operator applied to operand types it does not
+    support."""
+    if len(operands) == 1:
+        return f"Unsupported operand type for {symbol}: '{type_name(operands[0])}'"
+    return f"Unsupported operand types for {symbol}: '{type_name(operands[0])}' and '{type_name(operands[1])}'"
+
+
+def is_list(value):
+    return type(value) in LIST_TYPES
+
+
+def as_list(value):
+    """The Python list for a list value, for fallback paths."""
+    if type(value) is list:
+        return value
+    if type(value) in LAZY_TYPES:
+        return list(value)
+    return value.tolist()
+
+
+def iterate(value):
+    """An iterable over a list value's items, without copying lazy ones."""
+    if type(value) is list or type(value) in LAZY_TYPES:
+        return value
+    return value.tolist()
+
+
+def materialize(value):
+    """Build the items of a lazy list value as a real list value."""
+    if type(value) is Range:
+        return range_array(value.start, value.stop)
+    if type(value) is ListView:
+        return make_list(value.base[value.start:value.stop])
+    return value
+
+
+def to_json(value):
+    """A JSON-serializable copy of a script value."""
+    if type(value) is Range:
+        return str(value)
+    if type(value) in LIST_TYPES:
+        return [to_json(item) for item in iterate(value)]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def make_list(items):
+    """Build a list value, backed by NumPy when it is long enough and
+    every item is an int or every item is a float."""
+    if len(items) >= NUMPY_MIN_LENGTH and (numpy is not None or load_numpy()):
+        kind = type(items[0])
+        if (kind is int or kind is float) and all(type(item) is kind for item in items):
+            try:
+                return numpy.array(items, dtype=numpy.int64 if kind is int else numpy.float64).view(NumList)
+            except OverflowError:
+                # ints beyond 64 bits stay exact in a Python list
+                pass
+    return items
+
+
+def range_array(start, stop):
+    if stop - start >= NUMPY_MIN_LENGTH and (numpy is not None or load_numpy()):
+        return numpy.arange(start, stop, dtype=numpy.int64).view(NumList)
+    return list(range(start, stop))
+
+
+def range_bounds(start, end):
+    """The int bounds of `range(start, end)`, for range values and `for`
+    loops alike; raises TypeError or ValueError for bad ones."""
+    return int(start), int(end)
+
+
+def make_range(start, end):
+    return Range(*range_bounds(start, end))
+
+
+def make_view(value, start, end=None):
+    """A zero-copy slice of a list value, with Python slice semantics for
+    the bounds."""
+    check_list(value)
+    start, stop, _ = slice(int(start), None if end is None else int(end)).indices(len(value))
+    stop = max(start, stop)
+    if type(value) is Range:
+        return Range(value.start + start, value.start + stop)
+    if type(value) is ListView:
+        return ListView(value.base, value.start + start, value.start + stop)
+    if type(value) is list:
+        return ListView(value, start, stop)
+    # basic slicing of a NumPy array is already a view
+    return value[start:stop]
+
+
+def copy_list(value):
+    """`list(x)`: a list value holding its own items."""
+    check_list(value)
+    if type(value) in LAZY_TYPES:
+        return materialize(value)
+    return value.copy()
+
+
+def elementwise(op, left, right):
+    """Apply arithmetic or an ordering comparison where at least one
+    operand is a list; a non-list operand applies to every element.
+
+    Raises ZeroDivisionError for any zero divisor and ValueError when two
+    lists differ in length.
+    """
+    if type(left) in LAZY_TYPES:
+        left = materialize(left)
+    if type(right) in LAZY_TYPES:
+        right = materialize(right)
+
+    if op in ('DIV', 'MOD'):
+        divisors = as_list(right) if is_list(right) else (right,)
+        if any(d == 0 for d in divisors):
+            raise ZeroDivisionError("Division by zero")
+
+    if is_list(left) and is_list(right) and len(left) != len(right):
+        raise ValueError(f"List lengths differ ({len(left)} and {len(right)})")
+
+    func = ELEMENTWISE_OPS[op]
+    if (NumList is not None and type(left) in (NumList, int, float) and type(right) in (NumList, int, float)
+            and fits_int64(op, left, right)):
+        result = func(left, right)
+        return result if type(result) is NumList else make_list(result.tolist())
+
+    if is_list(left) and is_list(right):
+        return make_list([func(a, b) for a, b in zip(as_list(left), as_list(right))])
+    if is_list(left):
+        return make_list([func(a, right) for a in as_list(left)])
+    return make_list([func(left, b) for b in as_list(right)])
+
+
+def is_int_array(value):
+    return type(value) is NumList and value.dtype.kind == 'i'
+
+
+def int_bounds(value):
+    """The smallest and largest item of an int array, or an int twice,
+    as Python ints."""
+    if type(value) is int:
+        return value, value
+    if not len(value):
+        return 0, 0
+    return int(value.min()), int(value.max())
+
+
+def fits_int64(op, left, right):
+    """Whether NumPy computes `left op right` exactly: int arithmetic
+    wraps around past 64 bits, and ints beyond them do not convert."""
+    if op not in ('ADD', 'SUB', 'MUL', 'MOD'):
+        return True
+    if not (type(left) is int or is_int_array(left)) or not (type(right) is int or is_int_array(right)):
+        return True
+    left_min, left_max = int_bounds(left)
+    right_min, right_max = int_bounds(right)
+    if min(left_min, right_min) < INT64_MIN or max(left_max, right_max) > INT64_MAX:
+        return False
+    if op == 'ADD':
+        low, high = left_min + right_min, left_max + right_max
+    elif op == 'SUB':
+        low, high = left_min - right_max, left_max - right_min
+    elif op == 'MUL':
+        products = (left_min * right_min, left_min * right_max, left_max * right_min, left_max * right_max)
+        low, high = min(products), max(products)
+    else:
+        return True
+    return INT64_MIN <= low and high <= INT64_MAX
+
+
+def negate(value):
+    if type(value) in LAZY_TYPES:
+        value = materialize(value)
+    if type(value) is list or (is_int_array(value) and len(value) and value.min() == INT64_MIN):
+        return make_list([-item for item in as_list(value)])
+    return -value
+
+
+# Builtin functions callable from scripts
+
+def builtin_len(value):
+    if type(value) is Range:
+        # len() fails on lengths past sys.maxsize, which ranges can have
+        return value.stop - value.start
+    return len(value)
+
+
+def check_list(value):
+    if type(value) not in LIST_TYPES:
+        raise TypeError(f"expected a list, got {type_name(value)}")
+
+
+def builtin_sum(value):
+    check_list(value)
+    if type(value) is Range:
+        return (value.start + value.stop - 1) * len(value) // 2
+    if NumList is not None and type(value) is NumList:
+        if is_int_array(value):
+            low, high = int_bounds(value)
+            if max(-low, high) * len(value) > INT64_MAX:
+                return sum(value.tolist())
+        return value.sum().item()
+    return sum(iterate(value))
+
+
+def builtin_min(*values):
+    if len(values) > 1:
+        return min(values)
+    value = values[0]
+    check_list(value)
+    if not len(value):
+        raise ValueError("empty list")
+    if type(value) is Range:
+        return value.start
+    if NumList is not None and type(value) is NumList:
+        return value.min().item()
+    return min(iterate(value))
+
+
+def builtin_max(*values):
+    if len(values) > 1:
+        return max(values)
+    value = values[0]
+    check_list(value)
+    if not len(value):
+        raise ValueError("empty list")
+    if type(value) is Range:
+        return value.stop - 1
+    if NumList is not None and type(value) is NumList:
+        return value.max().item()
+    return max(iterate(value))
+
+
+BUILTINS = {
+    'len': builtin_len,
+    'sum': builtin_sum,
+    'min': builtin_min,
+    'max': builtin_max,
+    'range': make_range,
+    'view': make_view,
+    'list': copy_list,
+}
@@ -0,0 +1,171 @@
+"""Round-robin many scripts in one thread with asyncio.
+
+Every script runs on its own vm-engine `Interpreter` as a `ScriptTask`.
+The scheduler advances each one by a quantum of loop iterations (ticks)
+and then yields to the event loop, whose FIFO ready queue hands the next
+slice to the next script. Scripts can have a total tick budget and can
+be cancelled at any slice boundary.
+"""
+import asyncio
+
+from lexer.lexer import ScriptError
+from interpreter.interpreter import Interpreter
+from interpreter.output import CollectorSink
+
+DEFAULT_QUANTUM = 1000
+
+# spawn() budget meaning "the scheduler's default", so None can mean none
+DEFAULT_BUDGET = object()
+
+# ScriptHandle.status values
+PENDING = 'pending'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+EXHAUSTED = 'exhausted'
+
+
+class ScriptHandle:
+    """One script under a `Scheduler`, with its results and accounting."""
+
+    def __init__(self, name, interpreter, budget):
+        self.name = name
+        self.interpreter = interpreter
+        self.budget = budget
+        self.status = PENDING
+        self.error = None
+        self.task = None
+        self.cancelled = False
+        self.future = None
+
+    @property
+    def output(self):
+        return self.interpreter.output.getvalue()
+
+    @property
+    def variables(self):
+        return self.interpreter.variables
+
+    @property
+    def ticks(self):
+        return self.task.ticks if self.task else 0
+
+    @property
+    def slices(self):
+        return self.task.slices if self.task else 0
+
+    @property
+    def cpu_time(self):
+        return self.task.cpu_time if self.task else 0.0
+
+    @property
+    def done(self):
+        return self.status not in (PENDING, RUNNING)
+
+    def cancel(self):
+        """Stop the script before its next slice."""
+        self.cancelled = True
+
+    async def wait(self):
+        if self.future is not None:
+            await asyncio.shield(self.future)
+        return self
+
+    def __repr__(self):
+        return f'ScriptHandle({self.name!r}, {self.status}, ticks={self.ticks}, cpu_time={self.cpu_time:.6f})'
+
+
+class Scheduler:
+    """Runs many scripts concurrently by round-robin time-slicing.
+
+    `quantum` is the number of ticks a script may run before the next one
+    gets a turn. `budget`, when set, is the default total number of ticks
+    a script may run before it is stopped as exhausted.
+    """
+
+    def __init__(self, quantum=DEFAULT_QUANTUM, budget=None, optimize=0):
+        if quantum < 1:
+            raise ValueError("quantum must be at least 1")
+        self.quantum = quantum
+        self.budget = budget
+        self.optimize = optimize
+        self.handles = []
+
+    def spawn(self, source, variables=None, budget=DEFAULT_BUDGET, name=None):
+        """Add a script; it starts with the next `run()`, or right away if
+        the scheduler is already running. `budget` defaults to the
+        scheduler's; None runs the script without one."""
+        interpreter = Interpreter(engine='vm', optimize=self.optimize, cache=False, output=CollectorSink())
+        interpreter.variables = dict(variables or {})
+        handle = ScriptHandle(name or f'script-{len(self.handles)}', interpreter,
+                              self.budget if budget is DEFAULT_BUDGET else budget)
+        try:
+            handle.task = interpreter.start(source)
+        except ScriptError as e:
+            handle.status = FAILED
+            handle.error = str(e)
+        self.handles.append(handle)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            self.launch(handle)
+        return handle
+
+    def launch(self, handle):
+        if handle.future is None and handle.status == PENDING:
+            handle.future = asyncio.ensure_future(self.drive(handle))
+
+    async def drive(self, handle):
+        task = handle.task
+        handle.status = RUNNING
+        try:
+            while True:
+                if handle.cancelled:
+                    handle.status = CANCELLED
+                    break
+                quantum = self.quantum
+                if handle.budget is not None:
+                    left = handle.budget - task.ticks
+                    if left <= 0:
+                        handle.status = EXHAUSTED
+                        handle.error = f"Budget of {handle.budget} ticks exhausted"
+                        break
+                    quantum = min(quantum, left)
+                if task.step(quantum):
+                    handle.status = FINISHED
+                    break
+                await asyncio.sleep(0)
+        except ScriptError as e:
+            handle.status = FAILED
+            handle.error = str(e)
+        except asyncio.CancelledError:
+            handle.status = CANCELLED
+            raise
+        except Exception as e:
+            # a failure of one script must not fail the future run() waits on
+            handle.status = FAILED
+            handle.error = f"Internal error: {type(e).__name__}: {e}"
+        finally:
+            task.finish()
+
+    async def run(self):
+        """Run every spawned script until all of them are done."""
+        for handle in self.handles:
+            self.launch(handle)
+        while True:
+            futures = [handle.future for handle in self.handles if handle.future is not None and not handle.future.done()]
+            if not futures:
+                break
+            await asyncio.wait(futures)
+        return self.handles
+
+
+def run_scripts(sources, quantum=DEFAULT_QUANTUM, budget=None, optimize=0):
+    """Run `sources` concurrently in one thread; returns their handles."""
+    scheduler = Scheduler(quantum, budget, optimize)
+    for source in sources:
+        scheduler.spawn(source)
+    return asyncio.run(scheduler.run())
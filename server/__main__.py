@@ -0,0 +1,35 @@
+"""Run a script server: python -m server --socket PATH | --port PORT"""
+import argparse
+import sys
+
+from interpreter.interpreter import ENGINES
+from optimizer.optimizer import LEVELS
+from .server import DEFAULT_TIMEOUT, create_server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m server", description="Serve .at scripts from a pool of warm interpreters.")
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument("--socket", help="Unix socket path to listen on")
+    where.add_argument("--port", type=int, help="TCP port to listen on")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host to bind (default: 127.0.0.1)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="interpreter processes, which is also the concurrency limit (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help=f"default per-request timeout in seconds (default: {DEFAULT_TIMEOUT:g})")
+    parser.add_argument("--engine", choices=ENGINES, default="ast")
+    parser.add_argument("-O", type=int, choices=LEVELS, default=0, dest="optimize", help="optimization level")
+    args = parser.parse_args(argv)
+
+    address = args.socket if args.socket else (args.host, args.port)
+    server = create_server(address, workers=args.workers, engine=args.engine, optimize=args.optimize, timeout=args.timeout)
+    print(f"Serving on {args.socket or f'{args.host}:{server.server_address[1]}'} with {server.pool.size} workers", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""Long-lived script server backed by a pool of warm interpreter processes.
+
+Clients connect over a Unix socket or TCP and exchange JSON messages, one
+per line. A run request looks like
+
+    {"op": "run", "source": "echo x * 2;", "variables": {"x": 21}, "timeout": 5}
+
+and is answered with the captured output and the final variables:
+
+    {"ok": true, "output": "42\\n", "variables": {"x": 21}, "time": 0.0004}
+
+A failing script answers `"ok": false` with the `error` message and any
+output produced before it. `{"op": "stats"}` returns request counts,
+throughput and latency figures for the server.
+"""
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+
+from lexer.lexer import Lexer, ScriptError
+from interpreter.interpreter import Interpreter
+from interpreter.output import CollectorSink
+from runtime.values import to_json
+
+DEFAULT_TIMEOUT = 10.0
+# latencies kept for the percentiles in the stats response
+LATENCY_WINDOW = 1000
+
+# Workers are started from request handler threads when one has to be
+# replaced, and forking a multithreaded process is unsafe, so they are
+# started fresh instead
+CONTEXT = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+WARMUP_SOURCE = 'let warm = [1, 2, 3];\nfor w in warm { let warm = warm; }\necho f"{warm}";\n'
+
+
+def run_job(job, engine, optimize):
+    """Run one script request and return the response as a plain dict.
+
+    Every job gets a fresh `Interpreter`, so no variables leak from one
+    request into the next. Requests are mostly one-off sources, so they
+    are not written to the compiled-script cache.
+    """
+    start = time.perf_counter()
+    interpreter = Interpreter(engine=engine, optimize=optimize, cache=False, output=CollectorSink())
+    interpreter.variables = dict(job.get("variables") or {})
+    response = {"ok": True, "error": None}
+    try:
+        interpreter.interpret_source(job["source"])
+    except ScriptError as e:
+        response = {"ok": False, "error": str(e)}
+    except Exception as e:
+        response = {"ok": False, "error": f"Internal error: {type(e).__name__}: {e}"}
+    response["output"] = interpreter.output.getvalue()
+    response["variables"] = {name: to_json(value) for name, value in interpreter.variables.items()}
+    response["time"] = time.perf_counter() - start
+    return response
+
+
+def _worker_loop(conn, engine, optimize):
+    """Body of a pool worker: warm up, then run the jobs sent over `conn`."""
+    Interpreter(engine=engine, optimize=optimize, cache=False, output=CollectorSink()).interpret(Lexer(WARMUP_SOURCE).tokenize())
+    conn.send("ready")
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        conn.send(run_job(job, engine, optimize))
+
+
+class Worker:
+    """A warm interpreter process that runs one job at a time."""
+
+    def __init__(self, engine, optimize):
+        self.conn, child_conn = CONTEXT.Pipe()
+        self.process = CONTEXT.Process(target=_worker_loop, args=(child_conn, engine, optimize), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self):
+        if not self.ready:
+            self.conn.recv()
+            self.ready = True
+
+    def run(self, job, timeout):
+        """Send `job` and return its response, or None if it did not finish
+        within `timeout` seconds. Raises EOFError if the process died."""
+        self.wait_ready()
+        self.conn.send(job)
+        if not self.conn.poll(timeout):
+            return None
+        return self.conn.recv()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class Stats:
+    """Thread-safe request counters and latency figures."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.active = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def begin(self):
+        with self.lock:
+            self.requests += 1
+            self.active += 1
+
+    def end(self, outcome, latency):
+        with self.lock:
+            self.active -= 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.latencies.append(latency)
+
+    def snapshot(self, workers):
+        with self.lock:
+            uptime = time.time() - self.started
+            latencies = sorted(self.latencies)
+            completed = self.succeeded + self.failed + self.timeouts
+            return {
+                "uptime": uptime,
+                "workers": workers,
+                "requests": self.requests,
+                "active": self.active,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "throughput": completed / uptime if uptime else 0.0,
+                "latency": {
+                    "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                    "p50": percentile(latencies, 0.50),
+                    "p95": percentile(latencies, 0.95),
+                    "max": latencies[-1] if latencies else 0.0,
+                },
+            }
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class WorkerPool:
+    """A fixed number of warm workers; at most that many jobs run at once.
+
+    Jobs wait for a free worker. A job that runs past its timeout has its
+    worker killed and replaced by a fresh one.
+    """
+
+    def __init__(self, size, engine="ast", optimize=0):
+        self.size = size
+        self.engine = engine
+        self.optimize = optimize
+        self.idle = queue.Queue()
+        self.workers = []
+        for _ in range(size):
+            self.add_worker()
+        for worker in self.workers:
+            worker.wait_ready()
+
+    def add_worker(self):
+        worker = Worker(self.engine, self.optimize)
+        self.workers.append(worker)
+        self.idle.put(worker)
+
+    def replace(self, worker):
+        worker.kill()
+        self.workers.remove(worker)
+        self.add_worker()
+
+    def run(self, job, timeout):
+        """Run `job` on a free worker; returns the response dict, with
+        `"timeout": True` added when the job was cut off."""
+        worker = self.idle.get()
+        try:
+            response = worker.run(job, timeout)
+        except (EOFError, OSError):
+            self.replace(worker)
+            return {"ok": False, "error": "Worker process died", "output": "", "variables": {}}
+        if response is None:
+            self.replace(worker)
+            return {"ok": False, "timeout": True, "error": f"Timed out after {timeout:g} seconds",
+                    "output": "", "variables": {}}
+        self.idle.put(worker)
+        return response
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+
+
+class ScriptRequestHandler(socketserver.StreamRequestHandler):
+    """Answers JSON requests, one per line, until the client disconnects."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                response = {"ok": False, "error": f"Bad request: {e}"}
+            else:
+                response = self.server.dispatch(message)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class ScriptServerMixin:
+    """What the TCP and Unix socket servers share: the pool, stats and
+    request dispatch."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def setup_pool(self, workers, engine, optimize, timeout):
+        self.pool = WorkerPool(workers, engine, optimize)
+        self.stats = Stats()
+        self.timeout = timeout
+
+    def dispatch(self, message):
+        op = message.get("op", "run")
+        if op == "stats":
+            return {"ok": True, "stats": self.stats.snapshot(self.pool.size)}
+        if op != "run":
+            return {"ok": False, "error": f"Unknown op {op!r}"}
+        if not isinstance(message.get("source"), str):
+            return {"ok": False, "error": "Bad request: 'source' must be a string"}
+        if not isinstance(message.get("variables") or {}, dict):
+            return {"ok": False, "error": "Bad request: 'variables' must be an object"}
+
+        timeout = message.get("timeout") or self.timeout
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0:
+            return {"ok": False, "error": "Bad request: 'timeout' must be a positive number"}
+        self.stats.begin()
+        start = time.perf_counter()
+        response = self.pool.run({"source": message["source"], "variables": message.get("variables")}, timeout)
+        outcome = "timeouts" if response.get("timeout") else "succeeded" if response["ok"] else "failed"
+        self.stats.end(outcome, time.perf_counter() - start)
+        return response
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+
+
+class TCPScriptServer(ScriptServerMixin, socketserver.ThreadingTCPServer):
+    def __init__(self, address, workers=None, engine="ast", optimize=0, timeout=DEFAULT_TIMEOUT):
+        self.setup_pool(workers or os.cpu_count() or 1, engine, optimize, timeout)
+        super().__init__(address, ScriptRequestHandler)
+
+
+class UnixScriptServer(ScriptServerMixin, socketserver.ThreadingUnixStreamServer):
+    def __init__(self, path, workers=None, engine="ast", optimize=0, timeout=DEFAULT_TIMEOUT):
+        self.setup_pool(workers or os.cpu_count() or 1, engine, optimize, timeout)
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, ScriptRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def create_server(address, **options):
+    """A script server on a Unix socket path or a `(host, port)` pair."""
+    if isinstance(address, str):
+        return UnixScriptServer(address, **options)
+    return TCPScriptServer(address, **options)
+
+
+class ScriptClient:
+    """Minimal client for a script server, one connection per client."""
+
+    def __init__(self, address, timeout=None):
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        self.file = self.sock.makefile("rwb")
+
+    def request(self, message):
+        self.file.write(json.dumps(message).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    def run(self, source, variables=None, timeout=None):
+        message = {"op": "run", "source": source}
+        if variables:
+            message["variables"] = variables
+        if timeout:
+            message["timeout"] = timeout
+        return self.request(message)
+
+    def stats(self):
+        return self.request({"op": "stats"})["stats"]
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
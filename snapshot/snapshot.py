@@ -0,0 +1,119 @@
+"""Interpreter state snapshots.
+
+A snapshot holds the variables of an interpreter, typically right after
+a prelude of `let` statements, and optionally a script compiled against
+them. Restoring one gives a fresh interpreter with those variables
+without re-running the prelude; every restore is independent, so many
+runs can start from the same file.
+
+The file is a short header followed by one pickle:
+
+    magic (4 bytes) | format version (u16) | engine version (32 bytes) | pickle
+
+The engine version is the front-end fingerprint the compiled-script
+cache uses. A snapshot written by a different front end still restores
+its variables, but its compiled script is dropped and recompiled from
+the source kept beside it.
+"""
+import pickle
+import struct
+
+from cache.cache import engine_version
+from interpreter.interpreter import Interpreter
+from lexer.lexer import Lexer
+
+MAGIC = b"AHSN"
+# Bump when the payload layout changes incompatibly.
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sH32s")
+
+
+class Snapshot:
+    """Variables to start from, and optionally a script to run on them."""
+
+    def __init__(self, variables, engine="ast", optimize=0, source=None, compiled=None):
+        self.variables = variables
+        self.engine = engine
+        self.optimize = optimize
+        self.source = source
+        self.compiled = compiled
+
+    @classmethod
+    def capture(cls, interpreter, source=None):
+        """Snapshot `interpreter`'s variables. With `source`, that script is
+        compiled against them now, so runs from the snapshot skip the
+        front end as well."""
+        compiled = None
+        if source is not None and interpreter.engine != 'tokens':
+            compiled = interpreter.compile(Lexer(source).tokenize())
+        return cls(dict(interpreter.variables), interpreter.engine, interpreter.optimize, source, compiled)
+
+    def restore(self, **options):
+        """A new Interpreter holding a copy of the snapshot's variables.
+        `options` are passed to Interpreter; engine and optimization level
+        default to the snapshot's."""
+        options.setdefault("engine", self.engine)
+        options.setdefault("optimize", self.optimize)
+        interpreter = Interpreter(**options)
+        interpreter.variables.update(self.variables)
+        return interpreter
+
+    def run(self, **options):
+        """Restore the snapshot and run its script; returns the interpreter."""
+        if self.source is None:
+            raise ValueError("Snapshot has no script to run")
+        interpreter = self.restore(**options)
+        if (self.compiled is None or interpreter.engine != self.engine
+                or interpreter.optimize != self.optimize):
+            interpreter.interpret_source(self.source)
+        else:
+            interpreter.execute(self.compiled)
+        return interpreter
+
+    def dumps(self):
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, bytes.fromhex(engine_version()))
+        payload = (self.variables, self.engine, self.optimize, self.source, self.compiled)
+        return header + pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def loads(cls, data):
+        if len(data) < HEADER.size:
+            raise ValueError("Not a snapshot: file is truncated")
+        magic, version, fingerprint = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a snapshot: bad magic number")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {version}, expected {FORMAT_VERSION}")
+        try:
+            variables, engine, optimize, source, compiled = pickle.loads(memoryview(data)[HEADER.size:])
+        except Exception as e:
+            raise ValueError(f"Corrupt snapshot: {e}") from None
+        if fingerprint != bytes.fromhex(engine_version()):
+            # compiled by another front end; recompile from the source
+            compiled = None
+        return cls(variables, engine, optimize, source, compiled)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.dumps())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.loads(f.read())
+
+    def __repr__(self):
+        script = ", with script" if self.source is not None else ""
+        return f"Snapshot({len(self.variables)} variables, engine={self.engine!r}, optimize={self.optimize}{script})"
+
+
+def save_snapshot(interpreter, path, source=None):
+    """Write a snapshot of `interpreter` to `path`; see Snapshot.capture."""
+    snapshot = Snapshot.capture(interpreter, source)
+    snapshot.save(path)
+    return snapshot
+
+
+def load_snapshot(path, **options):
+    """A new Interpreter restored from the snapshot file at `path`."""
+    return Snapshot.load(path).restore(**options)
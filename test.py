@@ -1,12 +1,6 @@
 import sys
-import os
-import traceback
-import time
-import subprocess
-
-# Import everything from interpreter and lexer
-from interpreter import *
-from lexer import *
+from interpreter import Interpreter
+from lexer import Lexer
 
 with open("code.at", "r") as f:
     lexer = Lexer(f.read())
@@ -15,7 +9,8 @@ with open("code.at", "r") as f:
 
 
 tokens = lexer.tokenize()
-print(tokens, end="\n\n\n")
+if "--tokens" in sys.argv:
+    print(tokens, end="\n\n\n")
 
 inter = Interpreter()
 inter.interpret(tokens)
\ No newline at end of file
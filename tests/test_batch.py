@@ -0,0 +1,70 @@
+"""Tests for batch runs: results, failures and the script cache.
+
+    python -m pytest tests/test_batch.py
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from batch import run_batch, write_jsonl
+
+SCRIPTS = {
+    "a_ok.at": "let x = 1 + 2;\necho x;",
+    "b_script_error.at": "echo missing;",
+    "c_type_error.at": 'echo "x" - 1;',
+    "d_bad_encoding.at": b"echo \"\xff\";",
+    "e_ok.at": "echo [1, 2] * 2;",
+}
+
+
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for name, code in SCRIPTS.items():
+            mode = "wb" if isinstance(code, bytes) else "w"
+            with open(os.path.join(self.directory, name), mode) as f:
+                f.write(code)
+        self.missing = os.path.join(self.directory, "z_missing.at")
+
+    def run_all(self, jobs):
+        return list(run_batch([self.directory, self.missing], jobs=jobs))
+
+    def check_results(self, results):
+        names = [os.path.basename(result["path"]) for result in results]
+        self.assertEqual(names, sorted(SCRIPTS) + ["z_missing.at"])
+        by_name = dict(zip(names, results))
+        self.assertEqual([name for name in names if by_name[name]["ok"]], ["a_ok.at", "e_ok.at"])
+        self.assertEqual(by_name["a_ok.at"]["output"], "3\n")
+        self.assertEqual(by_name["e_ok.at"]["output"], "[2, 4]\n")
+        self.assertEqual(by_name["b_script_error.at"]["error"], "Syntax Error at token 2: Undefined variable 'missing'")
+        self.assertIn("Unsupported operand types for -", by_name["c_type_error.at"]["error"])
+        self.assertTrue(by_name["d_bad_encoding.at"]["error"].startswith("Cannot read script:"))
+        self.assertTrue(by_name["z_missing.at"]["error"].startswith("Cannot read script:"))
+
+    def test_failures_do_not_stop_the_batch(self):
+        self.check_results(self.run_all(jobs=1))
+
+    def test_failures_do_not_stop_the_batch_in_a_pool(self):
+        self.check_results(self.run_all(jobs=2))
+
+    def test_write_jsonl_counts(self):
+        stream = io.StringIO()
+        self.assertEqual(write_jsonl(self.run_all(jobs=1), stream), (2, 4))
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertFalse(json.loads(lines[-1])["ok"])
+
+    def test_scripts_are_not_cached(self):
+        cache_directory = os.path.join(self.directory, "cache")
+        with mock.patch.dict(os.environ, {"AHOVA_CACHE_DIR": cache_directory}):
+            self.run_all(jobs=1)
+        self.assertFalse(os.path.exists(cache_directory) and os.listdir(cache_directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
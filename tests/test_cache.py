@@ -0,0 +1,118 @@
+"""Tests for the compiled-script cache: keys, invalidation and eviction.
+
+    python -m pytest tests/test_cache.py
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from cache import cache as cache_module
+from cache.cache import FRONT_END_MODULES, ScriptCache, source_fingerprint
+from interpreter import Interpreter, CollectorSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = ScriptCache(self.directory)
+
+    def run_source(self, code, engine="ast", **options):
+        interpreter = Interpreter(engine=engine, cache=self.cache, output=CollectorSink(), **options)
+        interpreter.interpret_source(code)
+        return interpreter.output.getvalue()
+
+
+class KeyTests(CacheTestCase):
+    def test_round_trip(self):
+        key = self.cache.key("echo 1;", "ast")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, {"compiled": [1, 2]})
+        self.assertEqual(self.cache.get(key), {"compiled": [1, 2]})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_second_run_hits(self):
+        self.assertEqual(self.run_source("echo 1 + 2;"), "3\n")
+        self.assertEqual(self.run_source("echo 1 + 2;"), "3\n")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_engine_and_options_are_part_of_the_key(self):
+        for engine in ("ast", "vm", "py"):
+            self.assertEqual(self.run_source("echo 2 * 3;", engine), "6\n")
+        self.assertEqual(self.run_source("echo 2 * 3;", "vm", optimize=2), "6\n")
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 4))
+
+    def test_engine_version_change_misses(self):
+        self.run_source("echo 1;")
+        with mock.patch.object(cache_module, "_engine_version", "edited front end"):
+            self.run_source("echo 1;")
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+    def test_source_fingerprint_follows_edits(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for package, module in FRONT_END_MODULES:
+            os.makedirs(os.path.join(root, package), exist_ok=True)
+            shutil.copy(os.path.join(ROOT, package, module), os.path.join(root, package, module))
+        before = source_fingerprint(root)
+        self.assertEqual(source_fingerprint(root), before)
+        with open(os.path.join(root, "parser", "parser.py"), "a") as f:
+            f.write("\n# edited\n")
+        self.assertNotEqual(source_fingerprint(root), before)
+
+    def test_corrupt_entry_is_dropped(self):
+        key = self.cache.key("echo 1;", "ast")
+        with open(self.cache.path(key), "wb") as f:
+            f.write(b"not a pickle")
+        self.assertIsNone(self.cache.get(key))
+        self.assertFalse(os.path.exists(self.cache.path(key)))
+
+
+class EvictionTests(CacheTestCase):
+    def put_aged(self, name, age):
+        """Put an entry and date its last use `age` seconds back."""
+        key = self.cache.key(name)
+        self.cache.put(key, "x" * 1000)
+        when = 1_000_000_000 - age
+        os.utime(self.cache.path(key), (when, when))
+        return key
+
+    def test_least_recently_used_entries_go_first(self):
+        self.cache.max_bytes = 10_000
+        keys = [self.put_aged(f"script {n}", age=100 - n) for n in range(5)]
+        # reading the oldest entry makes it the most recently used
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.cache.max_bytes = 3500
+        self.cache.put(self.cache.key("newest"), "x" * 1000)
+        remaining = {key for key in keys if os.path.exists(self.cache.path(key))}
+        self.assertEqual(remaining, {keys[0], keys[4]})
+
+    def test_directory_is_only_scanned_past_the_limit(self):
+        with mock.patch.object(ScriptCache, "entries", wraps=self.cache.entries) as entries:
+            for n in range(20):
+                self.cache.put(self.cache.key(f"script {n}"), n)
+        # one scan to learn the starting size, none while under the limit
+        self.assertEqual(entries.call_count, 1)
+
+    def test_estimate_triggers_eviction(self):
+        self.cache.max_bytes = 5000
+        for n in range(20):
+            self.cache.put(self.cache.key(f"script {n}"), "x" * 1000)
+        total = sum(size for _, size, _ in self.cache.entries())
+        self.assertLessEqual(total, self.cache.max_bytes)
+        self.assertEqual(self.cache.size, total)
+
+
+class DefaultTests(unittest.TestCase):
+    def test_interpreter_cache_is_opt_in(self):
+        self.assertIsNone(Interpreter().cache)
+        with mock.patch.dict(os.environ, {"AHOVA_CACHE_DIR": tempfile.gettempdir()}):
+            self.assertIsInstance(Interpreter(cache=True).cache, ScriptCache)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""Tests for the `ahova` command's exit statuses and error reports.
+
+    python -m pytest tests/test_cli.py
+"""
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from ahova.cli import main
+
+
+class CliTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def run_script(self, code, *options):
+        path = os.path.join(self.directory, "script.at")
+        with open(path, "w") as f:
+            f.write(code)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            status = main([*options, "--no-cache", path])
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_success(self):
+        self.assertEqual(self.run_script("echo 1 + 2;"), (0, "3\n", ""))
+
+    def test_script_error(self):
+        status, _, stderr = self.run_script("echo missing;")
+        self.assertEqual(status, 1)
+        self.assertIn("Undefined variable 'missing'", stderr)
+
+    def test_unreadable_file(self):
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.assertEqual(main([os.path.join(self.directory, "missing.at")]), 2)
+        self.assertIn("cannot read", stderr.getvalue())
+
+    def test_other_errors_are_reported_without_a_traceback(self):
+        status, _, stderr = self.run_script("echo " + "(" * 3000 + "1" + ")" * 3000 + ";")
+        self.assertEqual(status, 1)
+        self.assertTrue(stderr.startswith("Internal error: RecursionError: maximum recursion depth exceeded"))
+        self.assertNotIn("Traceback", stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Tests that bad operands give the same ScriptError on every engine that
+compiles a program.
+
+    python -m pytest tests/test_errors.py
+"""
+import unittest
+
+from interpreter import Interpreter, CollectorSink
+from lexer.lexer import ScriptError
+
+ENGINES = ("ast", "vm", "py")
+HUGE = 10 ** 23
+
+
+class ErrorTestCase(unittest.TestCase):
+    def assert_error(self, code, message, engines=ENGINES, **options):
+        """Every engine, with and without the optimizer, fails on `code`
+        with `message`."""
+        for engine in engines:
+            for optimize in (0, 2):
+                with self.subTest(engine=engine, optimize=optimize):
+                    interpreter = Interpreter(engine=engine, optimize=optimize, output=CollectorSink(), **options)
+                    with self.assertRaises(ScriptError) as caught:
+                        interpreter.interpret_source(code)
+                    self.assertEqual(str(caught.exception), message)
+
+    def assert_output(self, code, output):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                interpreter = Interpreter(engine=engine, output=CollectorSink())
+                interpreter.interpret_source(code)
+                self.assertEqual(interpreter.output.getvalue(), output)
+
+
+class RangeTests(ErrorTestCase):
+    def test_loop_bounds_are_checked_like_range(self):
+        message = "range(): invalid literal for int() with base 10: 'a'"
+        self.assert_error('echo range(0, "a");', f"Runtime Error at token 2: {message}")
+        self.assert_error('for i in range(0, "a") { echo i; }', f"Runtime Error at token 1: {message}")
+        self.assert_error('for i in range([1], 2) { echo i; }', "Runtime Error at token 1: range(): int() argument must be "
+                          "a string, a bytes-like object or a real number, not 'list'")
+
+    def test_loop_bounds_in_memory_tracking(self):
+        self.assert_error('for i in range(0, "a") { echo i; }', "Runtime Error at token 1: range(): invalid literal "
+                          "for int() with base 10: 'a'", engines=("ast",), memory_limit=1 << 20)
+
+    def test_len_of_a_huge_range(self):
+        self.assert_output(f"echo len(range(0, {HUGE}));\necho sum(range({HUGE}, {HUGE} + 3));",
+                           f"{HUGE}\n{3 * HUGE + 3}\n")
+
+    def test_huge_ranges_that_need_a_length_fail_cleanly(self):
+        self.assert_error(f"echo view(range(0, {HUGE}), 5, 8);",
+                          "Runtime Error at token 2: view(): cannot fit 'int' into an index-sized integer")
+
+
+class ZeroDivisorTests(ErrorTestCase):
+    def test_scalar_modulo_by_zero(self):
+        for divisor in ("0", "0.0", "zero"):
+            self.assert_error(f"let zero = 0;\necho 5 % {divisor};", "Runtime Error at token 8: Division by zero")
+
+    def test_tokens_engine(self):
+        interpreter = Interpreter(engine="tokens", output=CollectorSink())
+        with self.assertRaises(ScriptError) as caught:
+            interpreter.interpret_source("echo 5 % 0;")
+        self.assertTrue(str(caught.exception).endswith("Division by zero"))
+
+    def test_list_and_scalar_agree(self):
+        self.assert_error("echo [5] % 0;", "Runtime Error at token 5: Division by zero")
+        self.assert_output("echo 5 % 3;\necho -5 % 3;\necho [5, -5] % 3;", "2\n1\n[2, 1]\n")
+
+
+class TypeNameTests(ErrorTestCase):
+    def test_strings_are_str_whatever_their_representation(self):
+        for length in (3, 300):
+            code = f'let s = "a" + "{"b" * (length - 1)}";\nfor c in s {{ echo c; }}'
+            self.assert_error(code, "Runtime Error at token 8: Expected list, got str")
+            self.assert_error(f'let s = "a" + "{"b" * (length - 1)}";\necho sum(s);',
+                              "Runtime Error at token 9: sum(): expected a list, got str")
+
+    def test_for_in_with_memory_tracking(self):
+        self.assert_error(f'let s = "a" + "{"b" * 299}";\nfor c in s {{ echo c; }}',
+                          "Runtime Error at token 8: Expected list, got str", engines=("ast",), memory_limit=1 << 20)
+
+
+class SuperinstructionTests(ErrorTestCase):
+    """The vm fuses loads, an operation and a store or branch into one
+    handler; anything but two numbers must still behave as unfused."""
+
+    def test_operands_that_are_not_numbers(self):
+        self.assert_output('let s = "a";\nlet s = s + "b";\nlet l = [1, 2];\nlet l = l * 2;\necho s;\necho l;\n'
+                           'if l < 3 { echo 1; }\nif s == "ab" { echo 2; }', "ab\n[2, 4]\n1\n2\n")
+
+    def test_errors_inside_a_fused_run(self):
+        self.assert_error('let i = "a";\nlet i = i - 1;', "Runtime Error at token 10: Unsupported operand types for -: "
+                          "'str' and 'int'")
+        self.assert_error("let zero = 0;\nlet i = 1;\nlet i = i / zero;", "Runtime Error at token 15: Division by zero")
+
+
+if __name__ == "__main__":
+    unittest.main()
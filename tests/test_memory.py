@@ -0,0 +1,91 @@
+"""Tests for the memory limit of the ast engine: lists are checked before
+they are built.
+
+    python -m pytest tests/test_memory.py
+"""
+import unittest
+from unittest import mock
+
+from interpreter import Interpreter, CollectorSink
+from interpreter import evaluator, memory
+from lexer.lexer import ScriptError
+from runtime import values
+from snapshot import Snapshot
+
+LIMIT = 64 * 1024
+# items whose estimated size is well past LIMIT
+LARGE = 100_000
+
+
+class MemoryLimitTests(unittest.TestCase):
+    def run_source(self, code):
+        interpreter = Interpreter(memory_limit=LIMIT, output=CollectorSink())
+        interpreter.interpret_source(code)
+        return interpreter
+
+    def assert_checked_first(self, code, token):
+        """`code` fails on the limit without building a list of LARGE items."""
+        with mock.patch.object(values, "range_array", wraps=values.range_array) as range_array:
+            with self.assertRaises(ScriptError) as caught:
+                self.run_source(code)
+        self.assertTrue(str(caught.exception).startswith(f"Runtime Error at token {token}: Memory limit of 64.0KB exceeded"))
+        self.assertEqual(range_array.call_count, 0)
+
+    def test_list_call_is_checked_before_it_materializes(self):
+        self.assert_checked_first(f"let a = list(range(0, {LARGE}));", 4)
+
+    def test_list_call_on_a_view_is_checked(self):
+        self.assert_checked_first(f"let a = list(view(range(0, {LARGE}), 10));", 4)
+
+    def test_list_arithmetic_is_checked_before_it_runs(self):
+        self.assert_checked_first(f"let r = range(0, {LARGE});\nlet a = r * 2;", 15)
+
+    def test_list_literal_is_checked_before_its_items(self):
+        code = "let a = [" + ", ".join(["1"] * (LIMIT // memory.ITEM_SIZE)) + "];"
+        with mock.patch.object(evaluator, "make_list", wraps=evaluator.make_list) as make_list:
+            with self.assertRaises(ScriptError):
+                self.run_source(code)
+        self.assertEqual(make_list.call_count, 0)
+
+    def test_small_lists_run(self):
+        interpreter = self.run_source("let a = list(range(0, 300));\nlet b = a * 2 + 1;\nlet c = [1, 2, 3];\necho sum(b);")
+        self.assertEqual(interpreter.output.getvalue(), "90000\n")
+        self.assertGreater(interpreter.memory.peak, 2 * memory.list_size(300))
+
+    def test_lazy_values_are_not_checked(self):
+        interpreter = self.run_source(f"let r = range(0, {LARGE});\necho sum(r);\necho len(view(r, 5));")
+        self.assertEqual(interpreter.output.getvalue(), f"{LARGE * (LARGE - 1) // 2}\n{LARGE - 5}\n")
+
+
+class SharedProgramTests(unittest.TestCase):
+    """One compiled program run with a memory limit and without one; the
+    limit must not leak into the program's inline caches."""
+
+    SOURCE = "let a = r * 2;\necho len(a);"
+
+    def setUp(self):
+        interpreter = Interpreter(output=CollectorSink())
+        interpreter.interpret_source(f"let r = range(0, {LARGE});")
+        self.snapshot = Snapshot.capture(interpreter, self.SOURCE)
+
+    def run_capped(self):
+        with mock.patch.object(values, "range_array", wraps=values.range_array) as range_array:
+            with self.assertRaises(ScriptError) as caught:
+                self.snapshot.run(memory_limit=LIMIT, output=CollectorSink())
+        self.assertIn("Memory limit of 64.0KB exceeded", str(caught.exception))
+        self.assertEqual(range_array.call_count, 0)
+
+    def run_uncapped(self):
+        self.assertEqual(self.snapshot.run(output=CollectorSink()).output.getvalue(), f"{LARGE}\n")
+
+    def test_capped_then_uncapped(self):
+        self.run_capped()
+        self.run_uncapped()
+
+    def test_uncapped_then_capped(self):
+        self.run_uncapped()
+        self.run_capped()
+
+
+if __name__ == "__main__":
+    unittest.main()
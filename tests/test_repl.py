@@ -0,0 +1,68 @@
+"""Tests for the REPL: continuation lines, errors and interruptions.
+
+    python -m pytest tests/test_repl.py
+"""
+import io
+import unittest
+from unittest import mock
+
+from ahova.repl import CONTINUATION, PROMPT, Repl
+from interpreter import BufferedSink
+
+ENGINES = ("ast", "vm", "py", "tokens")
+
+
+class ReplTests(unittest.TestCase):
+    def make_repl(self, engine="ast"):
+        self.stdout = io.StringIO()
+        repl = Repl(engine=engine, stdout=self.stdout)
+        repl.interpreter.output = BufferedSink(self.stdout)
+        return repl
+
+    def feed(self, repl, *lines):
+        for line in lines:
+            self.assertTrue(repl.feed(line))
+
+    def test_variables_persist(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                repl = self.make_repl(engine)
+                self.feed(repl, "let x = 2;", "echo x * 3;")
+                self.assertEqual(self.stdout.getvalue(), "6\n")
+
+    def test_open_block_continues(self):
+        repl = self.make_repl()
+        self.feed(repl, "if 1 == 1 {", "")
+        self.assertEqual(repl.prompt, CONTINUATION)
+        self.feed(repl, "echo 1;", "}")
+        self.assertEqual((repl.prompt, self.stdout.getvalue()), (PROMPT, "1\n"))
+
+    def test_blank_line_ends_an_input_missing_its_semicolon(self):
+        repl = self.make_repl()
+        self.feed(repl, "echo 1")
+        self.assertEqual(repl.prompt, CONTINUATION)
+        self.feed(repl, "")
+        self.assertEqual(repl.prompt, PROMPT)
+        self.assertEqual(self.stdout.getvalue(), "Syntax Error at token 3: Expected SEMICOLON, got EOF\n")
+        self.feed(repl, "echo 2;")
+        self.assertTrue(self.stdout.getvalue().endswith("\n2\n"))
+
+    def test_interrupt_keeps_the_session_and_its_variables(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                repl = self.make_repl(engine)
+                self.feed(repl, "let x = 1;")
+                write = repl.interpreter.output.write
+
+                def interrupt(text):
+                    write(text)
+                    raise KeyboardInterrupt
+                with mock.patch.object(repl.interpreter.output, "write", interrupt):
+                    self.feed(repl, "let x = 5;\necho x;\nlet x = 7;")
+                self.assertTrue(self.stdout.getvalue().endswith("5\ninterrupted\n"))
+                self.feed(repl, "echo x;")
+                self.assertTrue(self.stdout.getvalue().endswith("interrupted\n5\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
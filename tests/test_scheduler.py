@@ -0,0 +1,51 @@
+"""Tests for the round-robin scheduler: outcomes of each script.
+
+    python -m pytest tests/test_scheduler.py
+"""
+import asyncio
+import unittest
+from unittest import mock
+
+from scheduler import EXHAUSTED, FAILED, FINISHED, Scheduler
+
+COUNT = "let total = 0;\nfor i in range(0, 50) { let total = total + i; }\necho total;"
+
+
+class SchedulerTests(unittest.TestCase):
+    def test_script_errors_fail_only_that_script(self):
+        scheduler = Scheduler(quantum=10)
+        good = scheduler.spawn(COUNT)
+        bad = scheduler.spawn('echo "x" - 1;')
+        asyncio.run(scheduler.run())
+        self.assertEqual((good.status, good.output), (FINISHED, "1225\n"))
+        self.assertEqual(bad.status, FAILED)
+        self.assertIn("Unsupported operand types for -", bad.error)
+
+    def test_unexpected_errors_are_recorded(self):
+        scheduler = Scheduler(quantum=10)
+        good = scheduler.spawn(COUNT)
+        bad = scheduler.spawn(COUNT)
+        with mock.patch.object(bad.task, "step", side_effect=RuntimeError("boom")):
+            handles = asyncio.run(scheduler.run())
+        self.assertEqual([handle.status for handle in handles], [FINISHED, FAILED])
+        self.assertEqual(bad.error, "Internal error: RuntimeError: boom")
+        self.assertTrue(bad.future.done())
+        self.assertIsNone(bad.future.exception())
+        self.assertEqual(good.output, "1225\n")
+
+    def test_budgets(self):
+        scheduler = Scheduler(quantum=10, budget=20)
+        default = scheduler.spawn(COUNT)
+        unlimited = scheduler.spawn(COUNT, budget=None)
+        larger = scheduler.spawn(COUNT, budget=100)
+        asyncio.run(scheduler.run())
+        self.assertEqual((default.status, default.ticks), (EXHAUSTED, 20))
+        self.assertEqual([unlimited.status, larger.status], [FINISHED, FINISHED])
+        self.assertEqual(unlimited.output, "1225\n")
+
+    def test_scripts_are_not_cached(self):
+        self.assertIsNone(Scheduler().spawn("echo 1;").interpreter.cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
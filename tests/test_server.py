@@ -0,0 +1,97 @@
+"""Tests for the script server: responses, timeouts, worker replacement
+and stats.
+
+    python -m pytest tests/test_server.py
+"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from server.server import ScriptClient, create_server
+
+LOOP_FOREVER = "while 1 == 1 { let x = 1; }"
+
+
+class ServerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.cache_directory = os.path.join(cls.directory, "cache")
+        # workers inherit the environment; any cache writes would land here
+        cls.environ = mock.patch.dict(os.environ, {"AHOVA_CACHE_DIR": cls.cache_directory})
+        cls.environ.start()
+        cls.server = create_server(os.path.join(cls.directory, "server.sock"), workers=2, timeout=5)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.environ.stop()
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        self.client = ScriptClient(self.server.server_address, timeout=30)
+        self.addCleanup(self.client.close)
+
+    def test_run_returns_output_and_variables(self):
+        response = self.client.run("echo x * 2;\nlet y = [x, x];", variables={"x": 21})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["output"], "42\n")
+        self.assertEqual(response["variables"], {"x": 21, "y": [21, 21]})
+
+    def test_variables_do_not_leak_between_requests(self):
+        self.client.run("let secret = 1;")
+        response = self.client.run("echo secret;")
+        self.assertFalse(response["ok"])
+        self.assertIn("Undefined variable 'secret'", response["error"])
+
+    def test_operand_type_errors_are_script_errors(self):
+        response = self.client.run('echo "before";\necho "x" - 1;')
+        self.assertFalse(response["ok"])
+        self.assertEqual(response["error"], "Runtime Error at token 6: Unsupported operand types for -: 'str' and 'int'")
+        self.assertEqual(response["output"], "before\n")
+
+    def test_timeout_replaces_the_worker(self):
+        pool = self.server.pool
+        processes = {worker.process.pid for worker in pool.workers}
+        response = self.client.run(LOOP_FOREVER, timeout=0.5)
+        self.assertFalse(response["ok"])
+        self.assertTrue(response["timeout"])
+        self.assertEqual(len(pool.workers), pool.size)
+        self.assertEqual(len(processes & {worker.process.pid for worker in pool.workers}), pool.size - 1)
+        # the pool keeps serving at full size
+        for _ in range(pool.size * 2):
+            self.assertEqual(self.client.run("echo 1;")["output"], "1\n")
+
+    def test_stats_count_outcomes(self):
+        before = self.client.stats()
+        self.client.run("echo 1;")
+        self.client.run("echo missing;")
+        self.client.run(LOOP_FOREVER, timeout=0.5)
+        stats = self.client.stats()
+        self.assertEqual(stats["requests"] - before["requests"], 3)
+        self.assertEqual(stats["succeeded"] - before["succeeded"], 1)
+        self.assertEqual(stats["failed"] - before["failed"], 1)
+        self.assertEqual(stats["timeouts"] - before["timeouts"], 1)
+        self.assertEqual(stats["workers"], 2)
+        self.assertEqual(stats["active"], 0)
+        self.assertGreater(stats["latency"]["max"], 0.4)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.request({"op": "run"})["error"], "Bad request: 'source' must be a string")
+        self.assertIn("Unknown op", self.client.request({"op": "nope"})["error"])
+        self.assertEqual(self.client.request({"source": "echo 1;", "timeout": "soon"})["error"],
+                         "Bad request: 'timeout' must be a positive number")
+
+    def test_requests_do_not_write_the_script_cache(self):
+        self.client.run("echo 1 + 1;")
+        self.assertFalse(os.path.exists(self.cache_directory) and os.listdir(self.cache_directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,3 @@
+from .opcodes import *
+from .compiler import *
+from .machine import *
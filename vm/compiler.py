@@ -0,0 +1,206 @@
+from parser.nodes import *
+from .opcodes import *
+
+BINARY_OPCODES = {
+    'ADD': BINARY_ADD,
+    'SUB': BINARY_SUB,
+    'MUL': BINARY_MUL,
+    'DIV': BINARY_DIV,
+    'MOD': BINARY_MOD,
+}
+
+class Code:
+    """A compiled program: the flat instruction array plus its tables.
+
+    `positions` holds, for every instruction, the index of the token it was
+    compiled from so runtime errors can point back at the source. `names`
+    is the variable name of each slot, as assigned by the resolver.
+    """
+
+    def __init__(self, instructions, constants, names, positions, cache_size=0):
+        self.instructions = instructions
+        self.constants = constants
+        self.names = names
+        self.positions = positions
+        self.cache_size = cache_size
+
+    def disassemble(self):
+        lines = []
+        for pc, (op, arg) in enumerate(self.instructions):
+            name = OPNAMES[op]
+            if op in (LOAD_CONST, FORMAT_STRING):
+                detail = f' ({self.constants[arg]!r})'
+            elif op in (LOAD_SLOT, STORE_SLOT):
+                detail = f' ({self.names[arg]})'
+            elif op == COMPARE:
+                detail = f' ({COMPARE_OPS[arg]})'
+            else:
+                detail = ''
+            lines.append(f'{pc:>6} {name:<18} {arg}{detail}')
+        return '\n'.join(lines)
+
+
+class Compiler:
+    """Compiles a resolved `Program` into a `Code` object for the VM."""
+
+    def __init__(self):
+        self.instructions = []
+        self.positions = []
+        self.constants = []
+        self.constant_index = {}
+        self.statements = {
+            Let: self.compile_let,
+            Echo: self.compile_echo,
+            If: self.compile_if,
+            While: self.compile_while,
+            ForRange: self.compile_for_range,
+            ForIn: self.compile_for_in,
+        }
+        self.expressions = {
+            Const: self.compile_const,
+            FString: self.compile_fstring,
+            Name: self.compile_name,
+            ListLiteral: self.compile_list,
+            UnaryOp: self.compile_unary,
+            BinOp: self.compile_binop,
+            Compare: self.compile_compare,
+            Call: self.compile_call,
+            Hoisted: self.compile_hoisted,
+        }
+
+    def compile(self, program):
+        self.compile_block(program.body)
+        self.emit(HALT, 0, program)
+        return Code(self.instructions, self.constants, program.names, self.positions, program.cache_size)
+
+    def emit(self, op, arg, node):
+        offset = len(self.instructions)
+        self.instructions.append((op, arg))
+        self.positions.append(node.i)
+        return offset
+
+    def patch(self, offset, target):
+        self.instructions[offset] = (self.instructions[offset][0], target)
+
+    def here(self):
+        return len(self.instructions)
+
+    def constant(self, value):
+        # keyed on type too so 1, 1.0 and True stay distinct constants
+        key = (type(value), value)
+        if key not in self.constant_index:
+            self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return self.constant_index[key]
+
+    # Statements
+
+    def compile_block(self, body):
+        for node in body:
+            self.statements[type(node)](node)
+
+    def compile_let(self, node):
+        self.compile_expression(node.value)
+        self.emit(STORE_SLOT, node.slot, node)
+
+    def compile_echo(self, node):
+        self.compile_expression(node.value)
+        self.emit(ECHO, 0, node)
+
+    def compile_if(self, node):
+        self.compile_expression(node.condition)
+        skip_body = self.emit(POP_JUMP_IF_FALSE, 0, node)
+        self.compile_block(node.body)
+        if node.orelse:
+            skip_else = self.emit(JUMP, 0, node)
+            self.patch(skip_body, self.here())
+            self.compile_block(node.orelse)
+            self.patch(skip_else, self.here())
+        else:
+            self.patch(skip_body, self.here())
+
+    def compile_clear_hoisted(self, node):
+        for slot in node.hoisted:
+            self.emit(CLEAR_CACHED, slot, node)
+
+    def compile_while(self, node):
+        self.compile_clear_hoisted(node)
+        start = self.here()
+        self.compile_expression(node.condition)
+        exit_jump = self.emit(POP_JUMP_IF_FALSE, 0, node)
+        self.compile_block(node.body)
+        self.emit(JUMP, start, node)
+        self.patch(exit_jump, self.here())
+
+    def compile_for_range(self, node):
+        self.compile_clear_hoisted(node)
+        self.compile_expression(node.start)
+        self.compile_expression(node.end)
+        self.emit(GET_RANGE, 0, node)
+        self.compile_loop(node)
+
+    def compile_for_in(self, node):
+        self.compile_clear_hoisted(node)
+        self.compile_expression(node.iterable)
+        self.emit(GET_LIST_ITER, 0, node)
+        self.compile_loop(node)
+
+    def compile_loop(self, node):
+        # FOR_ITER leaves the next item on the stack, or pops the exhausted
+        # iterator and jumps past the loop
+        start = self.emit(FOR_ITER, 0, node)
+        self.emit(STORE_SLOT, node.slot, node)
+        self.compile_block(node.body)
+        self.emit(JUMP, start, node)
+        self.patch(start, self.here())
+
+    # Expressions
+
+    def compile_expression(self, node):
+        self.expressions[type(node)](node)
+
+    def compile_const(self, node):
+        self.emit(LOAD_CONST, self.constant(node.value), node)
+
+    def compile_fstring(self, node):
+        self.emit(FORMAT_STRING, self.constant((node.template, tuple(node.slots))), node)
+
+    def compile_name(self, node):
+        self.emit(LOAD_SLOT, node.slot, node)
+
+    def compile_list(self, node):
+        for item in node.items:
+            self.compile_expression(item)
+        self.emit(BUILD_LIST, len(node.items), node)
+
+    def compile_unary(self, node):
+        self.compile_expression(node.operand)
+        if node.op == 'SUB':
+            self.emit(NEGATE, 0, node)
+
+    def compile_binop(self, node):
+        self.compile_expression(node.left)
+        self.compile_expression(node.right)
+        self.emit(BINARY_OPCODES[node.op], 0, node)
+
+    def compile_compare(self, node):
+        self.compile_expression(node.left)
+        self.compile_expression(node.right)
+        self.emit(COMPARE, COMPARE_OPS.index(node.op), node)
+
+    def compile_call(self, node):
+        for arg in node.args:
+            self.compile_expression(arg)
+        self.emit(CALL_BUILTIN, (node.name, len(node.args)), node)
+
+    def compile_hoisted(self, node):
+        # LOAD_CACHED pushes the cached value and jumps past the computation
+        # once the slot is filled
+        load = self.emit(LOAD_CACHED, (node.slot, 0), node)
+        self.compile_expression(node.value)
+        self.emit(STORE_CACHED, node.slot, node)
+        self.instructions[load] = (LOAD_CACHED, (node.slot, self.here()))
+
+
+def compile_program(program):
+    return Compiler().compile(program)
@@ -0,0 +1,581 @@
+import operator
+
+from lexer.lexer import ScriptError
+from parser.resolver import UNBOUND, load_slots, store_slots
+from parser.nodes import SYMBOLS
+from runtime.values import BUILTINS, LIST_TYPES, elementwise, iterate, make_list, negate, operand_error, range_bounds, type_name
+from runtime.strings import STRING_TYPES, concat
+from .opcodes import *
+
+# marks an empty cache slot
+UNSET = object()
+
+# returned by the HALT handler; back-edge jumps return `~target`, which is
+# negative as well but never this far down
+HALTED = -(1 << 62)
+
+COMPARE_FUNCS = (
+    operator.eq,
+    operator.ne,
+    operator.gt,
+    operator.lt,
+    operator.ge,
+    operator.le,
+    operator.lt,
+    operator.gt,
+)
+
+# operand types fused instructions handle without the plain handlers
+NUMBER_TYPES = frozenset((int, float, bool))
+
+# number operation of each BINARY_* opcode, for fused instructions
+BINARY_FUNCS = {
+    BINARY_ADD: operator.add,
+    BINARY_SUB: operator.sub,
+    BINARY_MUL: operator.mul,
+    BINARY_DIV: operator.truediv,
+    BINARY_MOD: operator.mod,
+}
+
+# op name of each BINARY_* opcode and COMPARE argument, for list operands
+BINARY_NAMES = {
+    BINARY_ADD: 'ADD',
+    BINARY_SUB: 'SUB',
+    BINARY_MUL: 'MUL',
+    BINARY_DIV: 'DIV',
+    BINARY_MOD: 'MOD',
+}
+
+class Frame:
+    """Execution state of one run of a `Code` object.
+
+    Everything the dispatch loop needs to continue lives here, so a run
+    started with a tick budget can stop at a loop back-edge and be resumed
+    later from the same point.
+    """
+
+    def __init__(self, code, slots):
+        self.code = code
+        self.slots = slots
+        self.pc = 0
+        self.stack = []
+        self.cache = [UNSET] * code.cache_size
+        # loop iterations run so far, counted only under a budget
+        self.ticks = 0
+        # one handler per instruction, built by VM.link on the first resume
+        self.handlers = None
+
+
+class VM:
+    """Stack machine that runs a `Code` object produced by the compiler.
+
+    Before a frame first runs, every instruction is linked into a closure
+    with its argument, its position and the frame's stack, slots and cache
+    already bound. A handler does its instruction's work and returns the
+    pc to continue at, so the dispatch loop is one list index and one call
+    per instruction whatever the opcode, instead of a chain of comparisons.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.variables = interpreter.variables
+        self.linkers = {
+            LOAD_CONST: self.link_load_const,
+            LOAD_SLOT: self.link_load_slot,
+            STORE_SLOT: self.link_store_slot,
+            BINARY_ADD: self.link_binary_add,
+            BINARY_SUB: self.link_binary_arithmetic,
+            BINARY_MUL: self.link_binary_arithmetic,
+            BINARY_DIV: self.link_binary_arithmetic,
+            BINARY_MOD: self.link_binary_arithmetic,
+            COMPARE: self.link_compare,
+            JUMP: self.link_jump,
+            POP_JUMP_IF_FALSE: self.link_pop_jump_if_false,
+            FOR_ITER: self.link_for_iter,
+            GET_RANGE: self.link_get_range,
+            GET_LIST_ITER: self.link_get_list_iter,
+            NEGATE: self.link_negate,
+            BUILD_LIST: self.link_build_list,
+            FORMAT_STRING: self.link_format_string,
+            ECHO: self.link_echo,
+            HALT: self.link_halt,
+            LOAD_CACHED: self.link_load_cached,
+            STORE_CACHED: self.link_store_cached,
+            CLEAR_CACHED: self.link_clear_cached,
+            CALL_BUILTIN: self.link_call_builtin,
+        }
+
+    def error(self, code, pc, message):
+        token = code.positions[pc]
+        raise ScriptError(f"Runtime Error at token {token}: {message}")
+
+    def run(self, code):
+        slots = load_slots(code.names, self.variables)
+        try:
+            self.execute(code, slots)
+        finally:
+            store_slots(code.names, slots, self.variables)
+        return self.variables
+
+    def execute(self, code, slots):
+        self.resume(Frame(code, slots))
+
+    def resume(self, frame, budget=None):
+        """Run `frame` until it halts, returning True, or until `budget`
+        loop iterations have run, returning False with the frame saved at
+        the back-edge it stopped on."""
+        handlers = frame.handlers
+        if handlers is None:
+            handlers = frame.handlers = self.link(frame)
+        pc = frame.pc
+        while True:
+            while pc >= 0:
+                pc = handlers[pc]()
+            if pc == HALTED:
+                return True
+            # a back-edge: one loop iteration done
+            pc = ~pc
+            if budget is not None:
+                frame.ticks += 1
+                budget -= 1
+                if budget <= 0:
+                    frame.pc = pc
+                    return False
+
+    def link(self, frame):
+        """The handler of every instruction of `frame`'s code.
+
+        Where a common run of instructions starts, its first handler is
+        replaced by a superinstruction doing the whole run; the plain
+        handlers stay in place behind it for jumps into the run.
+        """
+        linkers = self.linkers
+        plain = []
+        for pc, (op, arg) in enumerate(frame.code.instructions):
+            linker = linkers.get(op, self.link_unknown)
+            plain.append(linker(frame, pc, op, arg))
+        handlers = list(plain)
+        for pc in range(len(plain)):
+            fused = self.fuse(frame, pc, plain)
+            if fused is not None:
+                handlers[pc] = fused
+        return handlers
+
+    def fuse(self, frame, pc, plain):
+        """A superinstruction for the run starting at `pc`, or None.
+
+        Fused runs are an operation on two operands loaded from slots or
+        constants, or on the top of the stack and one loaded operand,
+        optionally followed by a STORE_SLOT or POP_JUMP_IF_FALSE of the
+        result; and the FOR_ITER, STORE_SLOT pair starting every for loop.
+        """
+        instructions = frame.code.instructions
+        ops = [op for op, arg in instructions[pc:pc + 4]] + [None] * 4
+        if ops[0] == FOR_ITER and ops[1] == STORE_SLOT:
+            return self.link_for_iter_store(frame, pc, instructions[pc][1], instructions[pc + 1][1])
+        if ops[0] not in (LOAD_SLOT, LOAD_CONST):
+            return None
+        if ops[1] in (LOAD_SLOT, LOAD_CONST) and (ops[2] in BINARY_FUNCS or ops[2] == COMPARE):
+            left = self.operand(frame, *instructions[pc])
+            right = self.operand(frame, *instructions[pc + 1])
+            operation = pc + 2
+        elif ops[1] in BINARY_FUNCS or ops[1] == COMPARE:
+            left = None
+            right = self.operand(frame, *instructions[pc])
+            operation = pc + 1
+        else:
+            return None
+        op, arg = instructions[operation]
+        tail, tail_arg = instructions[operation + 1]
+        if tail not in (STORE_SLOT, POP_JUMP_IF_FALSE):
+            tail = tail_arg = None
+        if op == COMPARE:
+            function, divides = COMPARE_FUNCS[arg], False
+        else:
+            function, divides = BINARY_FUNCS[op], op == BINARY_DIV or op == BINARY_MOD
+        end = operation + 1 if tail is None else operation + 2
+        return self.link_fused(frame, pc, end, plain, left, right, function, divides, tail, tail_arg)
+
+    def operand(self, frame, op, arg):
+        """Where a fused instruction reads a loaded operand: a list and an
+        index into it."""
+        if op == LOAD_SLOT:
+            return frame.slots, arg
+        return [frame.code.constants[arg]], 0
+
+    # Handlers. Each linker returns the closure for one instruction at
+    # `pc`; the closure returns the pc to run next.
+
+    def link_load_const(self, frame, pc, op, arg):
+        push = frame.stack.append
+        value = frame.code.constants[arg]
+        following = pc + 1
+
+        def load_const():
+            push(value)
+            return following
+        return load_const
+
+    def link_load_slot(self, frame, pc, op, arg):
+        push = frame.stack.append
+        slots = frame.slots
+        error = self.error
+        code = frame.code
+        following = pc + 1
+
+        def load_slot():
+            value = slots[arg]
+            if value is UNBOUND:
+                error(code, pc, f"Undefined variable '{code.names[arg]}'")
+            push(value)
+            return following
+        return load_slot
+
+    def link_store_slot(self, frame, pc, op, arg):
+        pop = frame.stack.pop
+        slots = frame.slots
+        following = pc + 1
+
+        def store_slot():
+            slots[arg] = pop()
+            return following
+        return store_slot
+
+    def link_binary_add(self, frame, pc, op, arg):
+        stack = frame.stack
+        pop = stack.pop
+        list_types = LIST_TYPES
+        string_types = STRING_TYPES
+        elementwise = self.elementwise
+        code = frame.code
+        following = pc + 1
+
+        def binary_add():
+            right = pop()
+            left = stack[-1]
+            try:
+                if type(left) in list_types or type(right) in list_types:
+                    stack[-1] = elementwise(code, pc, 'ADD', left, right)
+                elif type(left) in string_types:
+                    stack[-1] = concat(left, right)
+                else:
+                    stack[-1] = left + right
+            except TypeError:
+                self.error(code, pc, operand_error('+', left, right))
+            return following
+        return binary_add
+
+    def link_binary_arithmetic(self, frame, pc, op, arg):
+        stack = frame.stack
+        pop = stack.pop
+        list_types = LIST_TYPES
+        elementwise = self.elementwise
+        code = frame.code
+        name = BINARY_NAMES[op]
+        divides = op == BINARY_DIV or op == BINARY_MOD
+        apply = BINARY_FUNCS[op]
+        following = pc + 1
+
+        def binary_arithmetic():
+            right = pop()
+            left = stack[-1]
+            try:
+                if type(left) in list_types or type(right) in list_types:
+                    stack[-1] = elementwise(code, pc, name, left, right)
+                elif divides and right == 0:
+                    self.error(code, pc, "Division by zero")
+                else:
+                    stack[-1] = apply(left, right)
+            except TypeError:
+                self.error(code, pc, operand_error(SYMBOLS[name], left, right))
+            return following
+        return binary_arithmetic
+
+    def link_compare(self, frame, pc, op, arg):
+        stack = frame.stack
+        pop = stack.pop
+        list_types = LIST_TYPES
+        elementwise = self.elementwise
+        code = frame.code
+        name = COMPARE_OPS[arg]
+        function = COMPARE_FUNCS[arg]
+        # == and != compare whole lists; the orderings are elementwise
+        ordering = arg > 1
+        following = pc + 1
+
+        def compare():
+            right = pop()
+            left = stack[-1]
+            try:
+                if ordering and (type(left) in list_types or type(right) in list_types):
+                    stack[-1] = elementwise(code, pc, name, left, right)
+                else:
+                    stack[-1] = function(left, right)
+            except TypeError:
+                self.error(code, pc, operand_error(SYMBOLS[name], left, right))
+            return following
+        return compare
+
+    def link_jump(self, frame, pc, op, arg):
+        # back-edges go through resume(), which counts them against a budget
+        target = ~arg if arg <= pc else arg
+
+        def jump():
+            return target
+        return jump
+
+    def link_fused(self, frame, start, end, plain, left, right, function, divides, tail, tail_arg):
+        """The superinstruction for the run `start`..`end` found by fuse().
+
+        `left` is None when the left operand is on the stack. Two numbers,
+        and no zero divisor, take the fast path; anything else runs the
+        plain handlers of the run, so errors come out just as unfused.
+        """
+        stack = frame.stack
+        slots = frame.slots
+        numbers = NUMBER_TYPES
+        on_stack = left is None
+        left_values, left_index = (stack, -1) if on_stack else left
+        right_values, right_index = right
+
+        def unfused():
+            pc = start
+            while start <= pc < end:
+                pc = plain[pc]()
+            return pc
+
+        if tail == STORE_SLOT:
+            def fused_store():
+                l = left_values[left_index]
+                r = right_values[right_index]
+                if type(l) not in numbers or type(r) not in numbers or (divides and not r):
+                    return unfused()
+                slots[tail_arg] = function(l, r)
+                if on_stack:
+                    del stack[-1]
+                return end
+            return fused_store
+
+        if tail == POP_JUMP_IF_FALSE:
+            def fused_jump():
+                l = left_values[left_index]
+                r = right_values[right_index]
+                if type(l) not in numbers or type(r) not in numbers or (divides and not r):
+                    return unfused()
+                if on_stack:
+                    del stack[-1]
+                if function(l, r):
+                    return end
+                return tail_arg
+            return fused_jump
+
+        push = stack.append
+
+        def fused():
+            l = left_values[left_index]
+            r = right_values[right_index]
+            if type(l) not in numbers or type(r) not in numbers or (divides and not r):
+                return unfused()
+            if on_stack:
+                stack[-1] = function(l, r)
+            else:
+                push(function(l, r))
+            return end
+        return fused
+
+    def link_for_iter_store(self, frame, pc, exhausted, slot):
+        stack = frame.stack
+        slots = frame.slots
+        following = pc + 2
+
+        def for_iter_store():
+            for item in stack[-1]:
+                slots[slot] = item
+                return following
+            stack.pop()
+            return exhausted
+        return for_iter_store
+
+    def link_pop_jump_if_false(self, frame, pc, op, arg):
+        pop = frame.stack.pop
+        following = pc + 1
+
+        def pop_jump_if_false():
+            if not pop():
+                return arg
+            return following
+        return pop_jump_if_false
+
+    def link_for_iter(self, frame, pc, op, arg):
+        stack = frame.stack
+        push = stack.append
+        following = pc + 1
+
+        def for_iter():
+            for item in stack[-1]:
+                push(item)
+                return following
+            stack.pop()
+            return arg
+        return for_iter
+
+    def link_get_range(self, frame, pc, op, arg):
+        stack = frame.stack
+        code = frame.code
+        following = pc + 1
+
+        def get_range():
+            end = stack.pop()
+            start = stack.pop()
+            try:
+                start, end = range_bounds(start, end)
+            except (TypeError, ValueError) as e:
+                self.error(code, pc, f"range(): {e}")
+            stack.append(iter(range(start, end)))
+            return following
+        return get_range
+
+    def link_get_list_iter(self, frame, pc, op, arg):
+        stack = frame.stack
+        code = frame.code
+        following = pc + 1
+
+        def get_list_iter():
+            value = stack.pop()
+            if type(value) not in LIST_TYPES:
+                self.error(code, pc, f"Expected list, got {type_name(value)}")
+            stack.append(iter(iterate(value)))
+            return following
+        return get_list_iter
+
+    def link_negate(self, frame, pc, op, arg):
+        stack = frame.stack
+        code = frame.code
+        following = pc + 1
+
+        def negate_top():
+            try:
+                stack[-1] = negate(stack[-1])
+            except TypeError:
+                self.error(code, pc, operand_error('-', stack[-1]))
+            return following
+        return negate_top
+
+    def link_build_list(self, frame, pc, op, arg):
+        stack = frame.stack
+        following = pc + 1
+
+        def build_list():
+            if arg:
+                items = stack[-arg:]
+                del stack[-arg:]
+            else:
+                items = []
+            stack.append(make_list(items))
+            return following
+        return build_list
+
+    def link_format_string(self, frame, pc, op, arg):
+        push = frame.stack.append
+        slots = frame.slots
+        code = frame.code
+        template, template_slots = frame.code.constants[arg]
+        following = pc + 1
+
+        def format_string():
+            push(self.format_string(code, pc, slots, template, template_slots))
+            return following
+        return format_string
+
+    def link_echo(self, frame, pc, op, arg):
+        pop = frame.stack.pop
+        write = self.interpreter.output.write
+        following = pc + 1
+
+        def echo():
+            write(str(pop()) + "\n")
+            return following
+        return echo
+
+    def link_halt(self, frame, pc, op, arg):
+        def halt():
+            frame.pc = pc
+            return HALTED
+        return halt
+
+    def link_load_cached(self, frame, pc, op, arg):
+        push = frame.stack.append
+        cache = frame.cache
+        slot, done = arg
+        following = pc + 1
+
+        def load_cached():
+            value = cache[slot]
+            if value is UNSET:
+                return following
+            push(value)
+            return done
+        return load_cached
+
+    def link_store_cached(self, frame, pc, op, arg):
+        stack = frame.stack
+        cache = frame.cache
+        following = pc + 1
+
+        def store_cached():
+            cache[arg] = stack[-1]
+            return following
+        return store_cached
+
+    def link_clear_cached(self, frame, pc, op, arg):
+        cache = frame.cache
+        following = pc + 1
+
+        def clear_cached():
+            cache[arg] = UNSET
+            return following
+        return clear_cached
+
+    def link_call_builtin(self, frame, pc, op, arg):
+        stack = frame.stack
+        code = frame.code
+        name, argc = arg
+        function = BUILTINS[name]
+        following = pc + 1
+
+        def call_builtin():
+            if argc:
+                args = stack[-argc:]
+                del stack[-argc:]
+            else:
+                args = []
+            try:
+                stack.append(function(*args))
+            except (TypeError, ValueError, OverflowError) as e:
+                self.error(code, pc, f"{name}(): {e}")
+            return following
+        return call_builtin
+
+    def link_unknown(self, frame, pc, op, arg):
+        code = frame.code
+
+        def unknown():
+            self.error(code, pc, f"Unknown opcode {op}")
+        return unknown
+
+    def elementwise(self, code, pc, op, left, right):
+        try:
+            return elementwise(op, left, right)
+        except ZeroDivisionError:
+            self.error(code, pc, "Division by zero")
+        except ValueError as e:
+            self.error(code, pc, str(e))
+
+    def format_string(self, code, pc, slots, template, template_slots):
+        values = []
+        for slot, name in zip(template_slots, template.names):
+            value = slots[slot]
+            if value is UNBOUND:
+                self.error(code, pc, f"Undefined variable '{name}' in f-string")
+            values.append(value)
+        return template.render(values)
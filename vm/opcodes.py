@@ -0,0 +1,34 @@
+# Opcodes for the stack VM. The code array holds one `(opcode, argument)`
+# pair per instruction, with 0 as the argument when it is unused. Jump
+# arguments are absolute instruction offsets into that array. LOAD_CACHED
+# and CALL_BUILTIN are the instructions whose argument is a pair:
+# `(slot, offset)` and `(function name, argument count)`.
+
+LOAD_CONST = 0
+LOAD_SLOT = 1
+STORE_SLOT = 2
+BINARY_ADD = 3
+BINARY_SUB = 4
+BINARY_MUL = 5
+BINARY_DIV = 6
+BINARY_MOD = 7
+COMPARE = 8
+JUMP = 9
+POP_JUMP_IF_FALSE = 10
+FOR_ITER = 11
+GET_RANGE = 12
+GET_LIST_ITER = 13
+NEGATE = 14
+BUILD_LIST = 15
+FORMAT_STRING = 16
+ECHO = 17
+HALT = 18
+LOAD_CACHED = 19
+STORE_CACHED = 20
+CLEAR_CACHED = 21
+CALL_BUILTIN = 22
+
+OPNAMES = {value: name for name, value in list(globals().items()) if name.isupper() and isinstance(value, int)}
+
+# Argument of COMPARE
+COMPARE_OPS = ('EQ', 'NEQ', 'GT', 'LT', 'GTE', 'LTE', 'LANGLE', 'RANGLE')